@@ -0,0 +1,11 @@
+#ifndef __PARTITION_H__
+#define __PARTITION_H__
+#include <stdio.h>
+#include <stdlib.h>
+#include "structures.h"
+
+int read_partition(const char *fname, int n, int size, int *owner);
+void cyclic_partition(int n, int size, int *owner);
+RowMap* build_row_map(int n, int size, int *owner);
+
+#endif
@@ -21,6 +21,11 @@ typedef struct {
     int *ghost_idx;
 } LocalX;
 
+typedef struct {
+    int *owner;     // rank owning global row (and x entry) g
+    int *local_idx; // position of g among the entries of its owner
+} RowMap;
+
 typedef struct {
     int i;
     double j;
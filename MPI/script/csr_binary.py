@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+# Binary sidecar of a .mtx file (<name>.csr next to <name>.mtx), little endian:
+#
+#   offset 0   magic    8 bytes  b"SPMV-CSR"
+#   offset 8   version  int32
+#   offset 12  rows     int32
+#   offset 16  cols     int32
+#   offset 20  (pad)    int32
+#   offset 24  nz       int64
+#   offset 32  row_ptr  int32[rows + 1]
+#              col_idx  int32[nz]         (padded to a multiple of 8 bytes)
+#              values   float64[nz]
+#
+# Indices are 0-based and entries are sorted by row, then column (the order
+# COOtoCSR produces), so the COO row array is np.repeat(arange(rows), diff(row_ptr)).
+MAGIC = b"SPMV-CSR"
+VERSION = 1
+HEADER = np.dtype([
+    ("magic", "S8"), ("version", "<i4"), ("rows", "<i4"),
+    ("cols", "<i4"), ("pad", "<i4"), ("nz", "<i8")
+])
+
+def sidecar_path(mtx_path):
+    return os.path.splitext(mtx_path)[0] + ".csr"
+
+def _offsets(rows, nz):
+    row_ptr_at = HEADER.itemsize
+    col_idx_at = row_ptr_at + 4 * (rows + 1)
+    values_at = col_idx_at + 4 * nz
+    values_at += -values_at % 8
+    return row_ptr_at, col_idx_at, values_at, values_at + 8 * nz
+
+def create(path, rows, cols, nz):
+    # Allocates the file and returns writable (row_ptr, col_idx, values)
+    # memmaps, so writers can fill it block by block.
+    row_ptr_at, col_idx_at, values_at, size = _offsets(rows, nz)
+
+    header = np.zeros(1, dtype=HEADER)
+    header[0] = (MAGIC, VERSION, rows, cols, 0, nz)
+    with open(path, "wb") as f:
+        f.write(header.tobytes())
+        f.truncate(size)
+
+    row_ptr = np.memmap(path, dtype="<i4", mode="r+", offset=row_ptr_at, shape=(rows + 1,))
+    col_idx = np.memmap(path, dtype="<i4", mode="r+", offset=col_idx_at, shape=(nz,))
+    values = np.memmap(path, dtype="<f8", mode="r+", offset=values_at, shape=(nz,))
+    return row_ptr, col_idx, values
+
+def write(path, rows, cols, row_ptr, col_idx, values):
+    out_row_ptr, out_col_idx, out_values = create(path, rows, cols, len(values))
+    out_row_ptr[:] = row_ptr
+    out_col_idx[:] = col_idx
+    out_values[:] = values
+    for array in (out_row_ptr, out_col_idx, out_values):
+        array.flush()
+
+def read(path):
+    # Returns (rows, cols, row_ptr, col_idx, values), the arrays being
+    # read-only memmaps on the file: nothing is parsed or copied.
+    header = np.fromfile(path, dtype=HEADER, count=1)
+    if len(header) != 1 or header["magic"][0] != MAGIC:
+        raise ValueError(f"{path} is not a binary CSR sidecar.")
+    if header["version"][0] != VERSION:
+        raise ValueError(f"{path}: unsupported version {header['version'][0]}.")
+
+    rows, cols, nz = int(header["rows"][0]), int(header["cols"][0]), int(header["nz"][0])
+    row_ptr_at, col_idx_at, values_at, _ = _offsets(rows, nz)
+
+    row_ptr = np.memmap(path, dtype="<i4", mode="r", offset=row_ptr_at, shape=(rows + 1,))
+    col_idx = np.memmap(path, dtype="<i4", mode="r", offset=col_idx_at, shape=(nz,))
+    values = np.memmap(path, dtype="<f8", mode="r", offset=values_at, shape=(nz,))
+    return rows, cols, row_ptr, col_idx, values
+
+def to_coo(row_ptr):
+    # 0-based row index of every entry
+    return np.repeat(np.arange(len(row_ptr) - 1, dtype=np.int32), np.diff(row_ptr))
+
+def read_mtx(mtx_path):
+    # Same reading as mm_read_unsymmetric_sparse / readMtx: coordinate real
+    # entries taken as they are (no symmetric expansion), 1-based in the file.
+    with open(mtx_path) as f:
+        banner = f.readline().lower().split()
+        if len(banner) < 4 or banner[2] != "coordinate" or banner[3] not in ("real", "integer"):
+            raise ValueError(f"{mtx_path}: only real coordinate Matrix Market files are supported.")
+        line = f.readline()
+        while line.startswith("%"):
+            line = f.readline()
+        rows, cols, nz = (int(x) for x in line.split())
+
+        entries = pd.read_csv(
+            f, sep=r"\s+", header=None, names=["row", "col", "val"], comment="%",
+            dtype={"row": np.int32, "col": np.int32, "val": np.float64}, engine="c"
+        )
+
+    if len(entries) != nz:
+        raise ValueError(f"{mtx_path}: header declares {nz} entries, found {len(entries)}.")
+
+    row_idx = entries["row"].to_numpy() - 1
+    col_idx = entries["col"].to_numpy() - 1
+    values = entries["val"].to_numpy()
+    return rows, cols, row_idx, col_idx, values
+
+def is_fresh(mtx_path):
+    path = sidecar_path(mtx_path)
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(mtx_path)
+
+def load_coo(mtx_path):
+    # (rows, cols, row_idx, col_idx, values) of a .mtx, 0-based, taken from
+    # its sidecar when that is up to date (sorted by row) or parsed otherwise
+    # (file order)
+    if is_fresh(mtx_path):
+        rows, cols, row_ptr, col_idx, values = read(sidecar_path(mtx_path))
+        return rows, cols, to_coo(row_ptr), col_idx, values
+    return read_mtx(mtx_path)
+
+def convert(mtx_path, out_path=None):
+    rows, cols, row_idx, col_idx, values = read_mtx(mtx_path)
+
+    order = np.lexsort((col_idx, row_idx))
+    row_ptr = np.zeros(rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(row_idx, minlength=rows), out=row_ptr[1:])
+
+    out_path = out_path or sidecar_path(mtx_path)
+    write(out_path, rows, cols, row_ptr, col_idx[order], values[order])
+    return out_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert .mtx files to binary CSR sidecars (<name>.csr).")
+    parser.add_argument("mtx", type=str, nargs="+")
+    parser.add_argument("--force", action="store_true",
+                        help="rewrite sidecars even if they are newer than the .mtx file")
+    args = parser.parse_args()
+
+    for mtx_path in args.mtx:
+        out_path = sidecar_path(mtx_path)
+        if not args.force and is_fresh(mtx_path):
+            print(f"{out_path} is up to date.")
+            continue
+        convert(mtx_path, out_path)
+        print(f"Converted {mtx_path} -> {out_path}")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import csr_binary
+import partition_sim
+
+INT_BYTES = partition_sim.INT_BYTES
+DOUBLE_BYTES = partition_sim.DOUBLE_BYTES
+PAIR_BYTES = 16  # Pair {int; double} and coo_instance {int; int; double}, padded
+
+# Allocations of main.c per rank, in program order. Nothing is freed before
+# MPI_Finalize except the scratch arrays of each phase, so the footprint of
+# a phase is everything allocated so far plus its scratch:
+#   setup     owner + row_map->local_idx (replicated), local COO arrays;
+#             rank 0 also holds the global COO, x and the scatter buffers
+#   csr       local_row_ptr, scratch coo_array of COOtoCSR
+#   ghosts    owned_x, ghost_entries, ghost_idx, scratch is_ghost mask
+#   remap     scratch global-to-local map
+#   exchange  merged_local_x, local_y, scratch buffers of ghost_exchange
+PHASES = ["setup", "csr", "ghosts", "remap", "exchange"]
+
+def rank_memory(row_idx, col_idx, M, N, size, row_owner=None, col_owner=None):
+    # Per-rank bytes of every phase (allocated and scratch), with the KB main.c
+    # reports (its formula only counts the arrays the SpMV reads) and the peak
+    stats = partition_sim.rank_stats(row_idx, col_idx, M, N, size, row_owner, col_owner)
+    n_local, load = stats["n_local"].to_numpy(), stats["load"].to_numpy()
+    n_ghost, n_sends = stats["n_ghost"].to_numpy(), stats["n_sends"].to_numpy()
+    nz = len(row_idx)
+    root = (np.arange(size) == 0).astype(np.int64)
+
+    allocated = {
+        "setup": (2 * max(M, N) * INT_BYTES +
+                  load * (2 * INT_BYTES + DOUBLE_BYTES) +
+                  root * (nz * (2 * INT_BYTES + DOUBLE_BYTES) * 2 +  # global COO + send_rows/cols/vals
+                          N * DOUBLE_BYTES * 2 +                     # random_vec + send_x
+                          size * INT_BYTES * 4)),                    # send_counts, displs, counts_x, displs_x
+        "csr": (n_local + 1) * INT_BYTES,
+        "ghosts": n_local * DOUBLE_BYTES + n_ghost * (DOUBLE_BYTES + INT_BYTES),
+        "remap": np.zeros(size, dtype=np.int64),
+        "exchange": (n_local + n_ghost) * DOUBLE_BYTES + n_local * DOUBLE_BYTES,
+    }
+    scratch = {
+        "setup": root * size * INT_BYTES,
+        "csr": load * PAIR_BYTES,
+        "ghosts": np.full(size, N, dtype=np.int64),
+        "remap": np.full(size, N * INT_BYTES, dtype=np.int64),
+        "exchange": (size * INT_BYTES * 5 +
+                     n_ghost * (INT_BYTES + DOUBLE_BYTES + PAIR_BYTES) +
+                     n_sends * (INT_BYTES + DOUBLE_BYTES)),
+    }
+
+    df = pd.DataFrame({"rank": np.arange(size), "n_local": n_local, "load": load,
+                       "n_ghost": n_ghost, "n_sends": n_sends, "reported_KB": stats["mem_KB"]})
+    resident = np.zeros(size, dtype=np.int64)
+    for phase in PHASES:
+        resident = resident + allocated[phase]
+        df[f"{phase}_KB"] = (resident + scratch[phase]) / 1024.0
+    df["resident_KB"] = resident / 1024.0
+    df["peak_KB"] = df[[f"{phase}_KB" for phase in PHASES]].max(axis=1)
+    return df
+
+def node_peak_KB(ranks, ppn, overhead_KB=0.0):
+    # mpiexec -ppn places ranks r*ppn .. (r+1)*ppn-1 on the r-th node; the
+    # phases run in lockstep, so the node peaks when its ranks do
+    per_rank = ranks[[f"{phase}_KB" for phase in PHASES]] + overhead_KB
+    return per_rank.groupby(ranks["rank"].to_numpy() // ppn).sum().max(axis=1)
+
+def predict(mtx_path, procs, ppn, overhead_KB=0.0):
+    M, N, row_idx, col_idx, _ = csr_binary.load_coo(mtx_path)
+    row_idx = np.asarray(row_idx, dtype=np.int64)
+    col_idx = np.asarray(col_idx, dtype=np.int64)
+
+    matrix_name = os.path.basename(mtx_path)
+    rows = []
+    for size in procs:
+        ranks = rank_memory(row_idx, col_idx, M, N, size)
+        nodes = node_peak_KB(ranks, ppn, overhead_KB)
+        rows.append({
+            "matrix_name": matrix_name,
+            "rows": M,
+            "procs": size,
+            "nodes": len(nodes),
+            "mpiprocs": min(size, ppn),
+            "max_mem_KB": ranks["reported_KB"].max(),
+            "min_mem_KB": ranks["reported_KB"].min(),
+            "avg_mem_KB": ranks["reported_KB"].mean(),
+            "max_resident_KB": ranks["resident_KB"].max(),
+            "max_peak_KB": ranks["peak_KB"].max(),
+            "root_peak_KB": ranks["peak_KB"].iloc[0],
+            "max_node_peak_KB": nodes.max(),
+        })
+    return pd.DataFrame(rows)
+
+def min_procs(predicted, node_memory_KB):
+    # smallest process count whose busiest node fits in node_memory_KB (None if none does)
+    fitting = predicted[predicted["max_node_peak_KB"] <= node_memory_KB]
+    return None if fitting.empty else fitting.loc[fitting["procs"].idxmin()]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Predict the per-rank and per-node memory of main.c for any process "
+                                                 "count and the smallest one fitting a per-node memory budget.")
+    parser.add_argument("mtx", type=str, nargs="+")
+    parser.add_argument("--procs", type=int, nargs="+", default=partition_sim.DEFAULT_PROCS)
+    parser.add_argument("--ppn", type=int, default=32, help="ranks per node, the mpiprocs of run.pbs (default 32)")
+    parser.add_argument("--node-memory-gb", type=float, help="memory available per node, in GB")
+    parser.add_argument("--rank-overhead-mb", type=float, default=0.0,
+                        help="memory of the MPI library and the binary per rank, in MB (default 0)")
+    parser.add_argument("--output", type=str, default="result/memory_model.csv")
+    args = parser.parse_args()
+
+    procs = sorted(set(args.procs))
+    frames = []
+    for mtx_path in args.mtx:
+        print(f"Predicting the memory of {mtx_path} on {len(procs)} process counts...")
+        predicted = predict(mtx_path, procs, args.ppn, args.rank_overhead_mb * 1024)
+        frames.append(predicted)
+
+        if args.node_memory_gb is not None:
+            best = min_procs(predicted, args.node_memory_gb * 1024 ** 2)
+            if best is None:
+                print(f"  no process count up to {procs[-1]} fits {args.node_memory_gb:g} GB per node")
+            else:
+                print(f"  fits from {best['procs']} processes: select={best['nodes']}:mpiprocs={best['mpiprocs']} "
+                      f"(busiest node {best['max_node_peak_KB'] / 1024 ** 2:.2f} GB, "
+                      f"rank 0 {best['root_peak_KB'] / 1024:.1f} MB)")
+    predicted = pd.concat(frames, ignore_index=True)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    predicted.to_csv(args.output, index=False, float_format="%.6f")
+    print(f"Saved {len(predicted)} rows to {args.output}")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import csr_binary
+import partition_sim
+import reorder
+
+STRATEGIES = ["cyclic", "block", "nnz", "rcm"]
+
+def block_partition(row_nnz, size):
+    # contiguous blocks of (almost) the same number of rows
+    M = len(row_nnz)
+    return np.arange(M, dtype=np.int64) * size // max(M, 1)
+
+def nnz_partition(row_nnz, size):
+    # contiguous blocks of (almost) the same number of nonzeros: each row
+    # goes to the rank whose share of the nnz prefix sum holds its midpoint
+    nz = row_nnz.sum()
+    if nz == 0:
+        return block_partition(row_nnz, size)
+    before = np.cumsum(row_nnz) - row_nnz
+    owner = np.floor((before + row_nnz / 2) * size / nz).astype(np.int64)
+    return np.minimum(owner, size - 1)
+
+def rcm_partition(row_nnz, size, perm):
+    # nnz-balanced contiguous blocks along the RCM order
+    owner = np.empty(len(row_nnz), dtype=np.int64)
+    owner[perm] = nnz_partition(row_nnz[perm], size)
+    return owner
+
+def available_strategies():
+    return STRATEGIES if reorder.sp is not None else [s for s in STRATEGIES if s != "rcm"]
+
+def evaluate(matrix_name, M, N, row_idx, col_idx, owner, size, strategy):
+    # the rows of x follow the rows of A (main.c distributes them with the same map)
+    col_owner = owner if M == N else partition_sim.cyclic_owner(N, size)
+    stats = partition_sim.rank_stats(row_idx, col_idx, M, N, size, owner, col_owner)
+    row = partition_sim.summarize(matrix_name, M, size, stats)
+    row = {key: value for key, value in row.items() if not key.endswith("_time")}
+    row["strategy"] = strategy
+    row["total_vol"] = stats["vol"].sum()
+    row["load_imbalance"] = stats["load"].max() / stats["load"].mean()
+    return row
+
+def write_partition(path, owner, size):
+    # format read by read_partition() in src/partition.c
+    with open(path, "w") as f:
+        f.write(f"{len(owner)} {size}\n")
+        f.write("\n".join(map(str, owner.tolist())))
+        f.write("\n")
+
+def plan(mtx_path, procs, strategies, map_dir=None):
+    M, N, row_idx, col_idx, _ = csr_binary.load_coo(mtx_path)
+    row_idx = np.asarray(row_idx, dtype=np.int64)
+    col_idx = np.asarray(col_idx, dtype=np.int64)
+    row_nnz = np.bincount(row_idx, minlength=M)
+    matrix_name = os.path.basename(mtx_path)
+
+    perm = reorder.rcm_permutation(M, N, row_idx, col_idx) if "rcm" in strategies else None
+
+    rows = []
+    for size in procs:
+        for strategy in strategies:
+            if strategy == "cyclic":
+                owner = partition_sim.cyclic_owner(M, size)
+            elif strategy == "block":
+                owner = block_partition(row_nnz, size)
+            elif strategy == "nnz":
+                owner = nnz_partition(row_nnz, size)
+            else:
+                owner = rcm_partition(row_nnz, size, perm)
+
+            rows.append(evaluate(matrix_name, M, N, row_idx, col_idx, owner, size, strategy))
+
+            if map_dir is not None:
+                name = os.path.splitext(matrix_name)[0]
+                write_partition(os.path.join(map_dir, f"{name}_{strategy}_p{size}.part"), owner, size)
+
+    columns = ["matrix_name", "rows", "procs", "strategy", "max_vol", "min_vol", "avg_vol", "total_vol",
+               "max_load", "min_load", "avg_load", "load_imbalance", "max_mem_KB", "min_mem_KB", "avg_mem_KB"]
+    return pd.DataFrame(rows)[columns]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare row partitions of a matrix by predicted communication "
+                                                 "volume and load imbalance, and write row-to-rank maps for main.")
+    parser.add_argument("mtx", type=str, nargs="+")
+    parser.add_argument("--procs", type=int, nargs="+", default=[2**i for i in range(1, 8)])
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=None,
+                        help="partitions to evaluate (default: all those available)")
+    parser.add_argument("--output", type=str, default="result/partition_plan.csv")
+    parser.add_argument("--write-maps", type=str, metavar="DIR",
+                        help="write <matrix>_<strategy>_p<procs>.part files, passed to main as its second argument")
+    args = parser.parse_args()
+
+    strategies = args.strategies or available_strategies()
+    if "rcm" in strategies and reorder.sp is None:
+        parser.error("the rcm strategy needs scipy")
+    if args.write_maps:
+        os.makedirs(args.write_maps, exist_ok=True)
+
+    frames = []
+    for mtx_path in args.mtx:
+        print(f"Planning {mtx_path}...")
+        frames.append(plan(mtx_path, args.procs, strategies, args.write_maps))
+    result = pd.concat(frames, ignore_index=True)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    result.to_csv(args.output, index=False, float_format="%.6f")
+
+    summary = result.pivot_table(index=["matrix_name", "procs"], columns="strategy",
+                                 values=["max_vol", "load_imbalance"], sort=False)
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.float_format", "{:.3f}".format):
+        print(summary)
+    print(f"Saved {len(result)} rows to {args.output}")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import csr_binary
+
+# Same header run.pbs writes for weak/strong scaling results
+COLUMNS = [
+    "matrix_name", "rows", "procs", "computation_time", "communication_time",
+    "max_vol", "min_vol", "avg_vol", "max_load", "min_load", "avg_load",
+    "max_mem_KB", "min_mem_KB", "avg_mem_KB"
+]
+
+DEFAULT_PROCS = [2**i for i in range(11)]
+
+INT_BYTES = 4
+DOUBLE_BYTES = 8
+
+def cyclic_owner(n, size):
+    # ownership of main.c: row (and x entry) g belongs to rank g % size
+    return np.arange(n, dtype=np.int64) % size
+
+def rank_stats(row_idx, col_idx, M, N, size, row_owner=None, col_owner=None):
+    # Per-rank quantities of main.c for a given ownership of the rows (and of
+    # the entries of x, which main.c distributes the same way):
+    #   load     nnz of the rank
+    #   n_ghost  distinct columns needed but owned by another rank (build_ghost_list)
+    #   n_sends  ghost entries other ranks request from it (ghost_exchange)
+    #   vol      n_sends + n_recvs, with n_recvs = n_ghost
+    #   mem_KB   the local_memory_used formula of main.c
+    if row_owner is None:
+        row_owner = cyclic_owner(M, size)
+    if col_owner is None:
+        col_owner = cyclic_owner(N, size)
+
+    entry_rank = row_owner[row_idx]
+    load = np.bincount(entry_rank, minlength=size)
+    n_local = np.bincount(row_owner, minlength=size)
+
+    # distinct (rank, column) pairs: the columns each rank touches (hashing,
+    # no sort needed since only their counts are used)
+    pairs = pd.unique(entry_rank * np.int64(N) + col_idx)
+    pair_rank = pairs // N
+    pair_owner = col_owner[pairs % N]
+    ghost = pair_owner != pair_rank
+
+    n_ghost = np.bincount(pair_rank[ghost], minlength=size)
+    n_sends = np.bincount(pair_owner[ghost], minlength=size)
+
+    mem_bytes = ((n_local + 1) * INT_BYTES +
+                 load * (INT_BYTES + DOUBLE_BYTES) +
+                 (n_local + n_ghost) * DOUBLE_BYTES +
+                 n_ghost * INT_BYTES +
+                 n_local * DOUBLE_BYTES)
+
+    return pd.DataFrame({
+        "rank": np.arange(size),
+        "n_local": n_local,
+        "load": load,
+        "n_ghost": n_ghost,
+        "n_sends": n_sends,
+        "vol": n_sends + n_ghost,
+        "mem_KB": mem_bytes / 1024.0,
+    })
+
+def summarize(matrix_name, M, size, stats):
+    # one row of strong_scaling.csv; times are not simulated
+    return {
+        "matrix_name": matrix_name,
+        "rows": M,
+        "procs": size,
+        "computation_time": np.nan,
+        "communication_time": np.nan,
+        "max_vol": stats["vol"].max(),
+        "min_vol": stats["vol"].min(),
+        "avg_vol": stats["vol"].mean(),
+        "max_load": stats["load"].max(),
+        "min_load": stats["load"].min(),
+        "avg_load": stats["load"].mean(),
+        "max_mem_KB": stats["mem_KB"].max(),
+        "min_mem_KB": stats["mem_KB"].min(),
+        "avg_mem_KB": stats["mem_KB"].mean(),
+    }
+
+def simulate(mtx_path, procs=DEFAULT_PROCS):
+    M, N, row_idx, col_idx, _ = csr_binary.load_coo(mtx_path)
+    row_idx = np.asarray(row_idx, dtype=np.int64)
+    col_idx = np.asarray(col_idx, dtype=np.int64)
+
+    matrix_name = os.path.basename(mtx_path)
+    rows = [summarize(matrix_name, M, size, rank_stats(row_idx, col_idx, M, N, size)) for size in procs]
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+def compare(predicted, measured_csv):
+    # max abs difference of every predicted column over the runs found in measured_csv
+    measured = pd.read_csv(measured_csv)
+    merged = predicted.merge(measured, on=["matrix_name", "procs"], suffixes=("", "_measured"))
+    if merged.empty:
+        print(f"No (matrix, procs) of the simulation found in {measured_csv}.")
+        return
+
+    for col in COLUMNS[5:]:
+        diff = (merged[col] - merged[f"{col}_measured"]).abs().max()
+        print(f"{col:>12}: max |predicted - measured| = {diff:.6f} over {len(merged)} runs")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Predict the volume, load and memory columns of strong_scaling.csv "
+                                                 "for the cyclic distribution of main.c, without running it.")
+    parser.add_argument("mtx", type=str, nargs="+")
+    parser.add_argument("--procs", type=int, nargs="+", default=DEFAULT_PROCS)
+    parser.add_argument("--output", type=str, default="result/simulated_scaling.csv")
+    parser.add_argument("--compare", type=str, metavar="CSV",
+                        help="measured results (e.g. result/strong_scaling.csv) to check the prediction against")
+    args = parser.parse_args()
+
+    frames = []
+    for mtx_path in args.mtx:
+        print(f"Simulating {mtx_path} on {len(args.procs)} process counts...")
+        frames.append(simulate(mtx_path, args.procs))
+    predicted = pd.concat(frames, ignore_index=True)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    predicted.to_csv(args.output, index=False, na_rep="Nan", float_format="%.6f")
+    print(f"Saved {len(predicted)} rows to {args.output}")
+
+    if args.compare:
+        compare(predicted, args.compare)
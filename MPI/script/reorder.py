@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import csr_binary
+
+try:
+    import scipy.sparse as sp
+    from scipy.sparse.csgraph import reverse_cuthill_mckee
+except ImportError:
+    sp = None
+
+ORDERINGS = ["rcm", "degree", "cluster"]
+
+def symmetric_edges(row_idx, col_idx):
+    # both directions of every off-diagonal entry, i.e. the pattern of A + A^T
+    off = row_idx != col_idx
+    return np.concatenate([row_idx[off], col_idx[off]]), np.concatenate([col_idx[off], row_idx[off]])
+
+def rcm_permutation(M, N, row_idx, col_idx):
+    # reverse Cuthill-McKee order of the symmetrized pattern (A + A^T), padded
+    # to max(M, N) vertices; only the vertices that are rows are kept
+    pattern = sp.csr_matrix((np.ones(len(row_idx), dtype=np.int8), (row_idx, col_idx)), shape=(M, N))
+    n = max(M, N)
+    pattern.resize(n, n)
+    perm = np.asarray(reverse_cuthill_mckee((pattern + pattern.T).tocsr(), symmetric_mode=True))
+    return perm[perm < M]
+
+def degree_permutation(M, N, row_idx, col_idx):
+    # rows by decreasing number of nonzeros (stable, so ties keep their order)
+    return np.argsort(-np.bincount(row_idx, minlength=M), kind="stable")
+
+def cluster_permutation(M, N, row_idx, col_idx, iterations=20, seed=0):
+    # Label propagation on the symmetrized pattern: every vertex repeatedly
+    # takes the most frequent label among its neighbours (ties to the
+    # smallest), half of them per sweep so that labels do not oscillate.
+    # Clusters are then laid out in the order of their first row.
+    rng = np.random.default_rng(seed)
+    u, v = symmetric_edges(row_idx, col_idx)
+    labels = np.arange(M, dtype=np.int64)
+    for _ in range(iterations):
+        keys, counts = np.unique(u * np.int64(M) + labels[v], return_counts=True)
+        node, label = keys // M, keys % M
+        best = np.lexsort((label, -counts, node))
+        first = np.ones(len(best), dtype=bool)
+        first[1:] = node[best][1:] != node[best][:-1]
+        proposal = labels.copy()
+        proposal[node[best][first]] = label[best][first]
+
+        update = rng.random(M) < 0.5
+        changed = update & (proposal != labels)
+        if not changed.any():
+            break
+        labels[changed] = proposal[changed]
+
+    cluster_start = np.full(M, M, dtype=np.int64)
+    np.minimum.at(cluster_start, labels, np.arange(M, dtype=np.int64))
+    return np.lexsort((np.arange(M), cluster_start[labels]))
+
+def permutation(ordering, M, N, row_idx, col_idx):
+    if M != N:
+        raise ValueError("Symmetric permutations need a square matrix.")
+    if ordering == "rcm":
+        if sp is None:
+            raise ValueError("The rcm ordering needs scipy.")
+        return rcm_permutation(M, N, row_idx, col_idx)
+    if ordering == "degree":
+        return degree_permutation(M, N, row_idx, col_idx)
+    if ordering == "cluster":
+        return cluster_permutation(M, N, row_idx, col_idx)
+    raise ValueError(f"Unknown ordering '{ordering}'. Use one of {ORDERINGS}.")
+
+def available_orderings():
+    return ORDERINGS if sp is not None else [o for o in ORDERINGS if o != "rcm"]
+
+def apply(perm, row_idx, col_idx):
+    # B = P A P^T: entry (i, j) of A goes to (inverse[i], inverse[j]), where
+    # perm[k] is the original index of the k-th row of B
+    inverse = np.empty_like(perm)
+    inverse[perm] = np.arange(len(perm), dtype=perm.dtype)
+    return inverse[row_idx], inverse[col_idx]
+
+def bandwidth_profile(row_idx, col_idx):
+    # bandwidth max |i - j| and profile sum_i (i - first column of row i),
+    # counting only the rows with entries left of the diagonal
+    if len(row_idx) == 0:
+        return 0, 0
+    bandwidth = int(np.abs(row_idx.astype(np.int64) - col_idx).max())
+    first = pd.Series(col_idx).groupby(row_idx).min()
+    profile = int(np.maximum(first.index.to_numpy() - first.to_numpy(), 0).sum())
+    return bandwidth, profile
+
+def read_banner(mtx_path):
+    with open(mtx_path) as f:
+        return f.readline().lower().split()
+
+def write_mtx(path, rows, cols, row_idx, col_idx, values, symmetry="general", comment=None):
+    # sorted by row, then column, 1-based; values in their shortest round-trip form
+    order = np.lexsort((col_idx, row_idx))
+    with open(path, "w") as f:
+        f.write(f"%%MatrixMarket matrix coordinate real {symmetry}\n")
+        if comment:
+            f.write(f"% {comment}\n")
+        f.write(f"{rows} {cols} {len(values)}\n")
+        entries = pd.DataFrame({"row": row_idx[order] + 1, "col": col_idx[order] + 1, "val": values[order]})
+        entries.to_csv(f, sep=" ", header=False, index=False)
+
+def write_permutation(path, perm):
+    # first line the size, then the original (0-based) index of every new row
+    with open(path, "w") as f:
+        f.write(f"{len(perm)}\n")
+        f.write("\n".join(map(str, perm.tolist())))
+        f.write("\n")
+
+def read_permutation(path):
+    with open(path) as f:
+        n = int(f.readline())
+        perm = np.loadtxt(f, dtype=np.int64, ndmin=1)
+    if len(perm) != n:
+        raise ValueError(f"{path}: header declares {n} entries, found {len(perm)}.")
+    return perm
+
+def reorder(mtx_path, orderings, out_dir=None, binary=True):
+    # Reports bandwidth and profile of the original matrix and of every
+    # ordering; with out_dir, writes <name>_<ordering>.mtx (and .csr, .perm).
+    # The entries are read in file order, without the sidecar, so that
+    # symmetric files keep their stored triangle.
+    M, N, row_idx, col_idx, values = csr_binary.read_mtx(mtx_path)
+    row_idx = np.asarray(row_idx, dtype=np.int64)
+    col_idx = np.asarray(col_idx, dtype=np.int64)
+    matrix_name = os.path.basename(mtx_path)
+    banner = read_banner(mtx_path)
+    symmetry = banner[4] if len(banner) > 4 else "general"
+
+    bandwidth, profile = bandwidth_profile(row_idx, col_idx)
+    rows = [{"matrix_name": matrix_name, "ordering": "original", "bandwidth": bandwidth, "profile": profile}]
+    for ordering in orderings:
+        perm = permutation(ordering, M, N, row_idx, col_idx)
+        new_rows, new_cols = apply(perm, row_idx, col_idx)
+        if symmetry != "general":
+            # keep the lower triangle a symmetric file stores
+            new_rows, new_cols = np.maximum(new_rows, new_cols), np.minimum(new_rows, new_cols)
+        bandwidth, profile = bandwidth_profile(new_rows, new_cols)
+        rows.append({"matrix_name": matrix_name, "ordering": ordering, "bandwidth": bandwidth, "profile": profile})
+
+        if out_dir is not None:
+            base = os.path.join(out_dir, f"{os.path.splitext(matrix_name)[0]}_{ordering}")
+            write_mtx(base + ".mtx", M, N, new_rows, new_cols, values, symmetry,
+                      comment=f"{matrix_name} reordered by {ordering}, permutation in {os.path.basename(base)}.perm")
+            write_permutation(base + ".perm", perm)
+            if binary:
+                csr_binary.convert(base + ".mtx")
+            print(f"  wrote {base}.mtx")
+
+    df = pd.DataFrame(rows)
+    original = df.iloc[0]
+    df["bandwidth_ratio"] = df["bandwidth"] / max(original["bandwidth"], 1)
+    df["profile_ratio"] = df["profile"] / max(original["profile"], 1)
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reorder square matrices (reverse Cuthill-McKee, degree sort, label "
+                                                 "propagation clusters) and report bandwidth and profile before and after.")
+    parser.add_argument("mtx", type=str, nargs="+")
+    parser.add_argument("--orderings", nargs="+", choices=ORDERINGS, default=None,
+                        help="orderings to compute (default: all those available)")
+    parser.add_argument("--outdir", type=str, default="data/reordered",
+                        help="where <name>_<ordering>.mtx/.csr/.perm are written")
+    parser.add_argument("--report-only", action="store_true", help="do not write the reordered matrices")
+    parser.add_argument("--no-binary", action="store_true", help="do not write the binary CSR sidecars")
+    parser.add_argument("--output", type=str, default="result/reorder.csv")
+    args = parser.parse_args()
+
+    orderings = args.orderings or available_orderings()
+    if "rcm" in orderings and sp is None:
+        parser.error("the rcm ordering needs scipy")
+    out_dir = None if args.report_only else args.outdir
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    frames = []
+    for mtx_path in args.mtx:
+        print(f"Reordering {mtx_path}...")
+        frames.append(reorder(mtx_path, orderings, out_dir, not args.no_binary))
+    result = pd.concat(frames, ignore_index=True)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    result.to_csv(args.output, index=False, float_format="%.6f")
+    with pd.option_context("display.width", 200):
+        print(result.to_string(index=False, float_format="{:.3f}".format))
+    print(f"Saved {len(result)} rows to {args.output}")
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import partition_sim
+
+# Time of the critical rank of main.c as two separately fitted terms:
+#   computation    = per_nz * max_load + overhead
+#   communication  = latency * (procs - 1) + max_vol * 8 bytes / bandwidth
+# (ghost_exchange is an MPI_Alltoallv, one message slot per peer).
+COMPUTE_TERMS = ["per_nz", "overhead"]
+COMM_TERMS = ["latency", "per_byte"]
+
+def nnls(X, y, weights):
+    # weighted least squares, refitting without the terms that come out negative
+    Xw, yw = X * weights[:, None], y * weights
+    active = np.ones(X.shape[1], dtype=bool)
+    while True:
+        coef = np.zeros(X.shape[1])
+        if active.any():
+            coef[active] = np.linalg.lstsq(Xw[:, active], yw, rcond=None)[0]
+        if (coef >= 0).all():
+            return coef
+        active &= coef > 0
+
+def compute_design(max_load):
+    return np.column_stack([np.asarray(max_load, dtype=np.float64), np.ones(len(max_load))])
+
+def comm_design(procs, max_vol):
+    procs = np.asarray(procs, dtype=np.float64)
+    return np.column_stack([procs - 1, np.asarray(max_vol, dtype=np.float64) * partition_sim.DOUBLE_BYTES])
+
+def fit(series):
+    # Both terms are fitted on relative errors (weights 1/y), since the times
+    # of a matrix span orders of magnitude across process counts.
+    compute = series["computation_time"].to_numpy(np.float64)
+    compute_coef = nnls(compute_design(series["max_load"]), compute, 1 / compute)
+
+    parallel = series[series["procs"] > 1]
+    comm = parallel["communication_time"].to_numpy(np.float64)
+    comm_coef = nnls(comm_design(parallel["procs"], parallel["max_vol"]), comm, 1 / np.maximum(comm, 1e-9))
+    return compute_coef, comm_coef
+
+def predict(compute_coef, comm_coef, procs, max_load, max_vol):
+    compute = compute_design(max_load) @ compute_coef
+    comm = comm_design(procs, max_vol) @ comm_coef
+    return compute, comm
+
+def bootstrap(series, procs, max_load, max_vol, resamples=1000, confidence=0.9, rng=None):
+    # Residual bootstrap: the relative residuals of each term are resampled
+    # onto the fitted values, the model refitted and the total time predicted.
+    rng = np.random.default_rng() if rng is None else rng
+    compute_coef, comm_coef = fit(series)
+    fitted_compute, fitted_comm = predict(compute_coef, comm_coef, series["procs"], series["max_load"], series["max_vol"])
+    compute_ratio = series["computation_time"].to_numpy() / fitted_compute
+    parallel = (series["procs"] > 1).to_numpy()
+    comm_ratio = series["communication_time"].to_numpy()[parallel] / np.maximum(fitted_comm[parallel], 1e-12)
+
+    totals = []
+    for _ in range(resamples):
+        resampled = series.copy()
+        resampled["computation_time"] = fitted_compute * rng.choice(compute_ratio, size=len(series))
+        comm = np.zeros(len(series))
+        comm[parallel] = fitted_comm[parallel] * rng.choice(comm_ratio, size=parallel.sum())
+        resampled["communication_time"] = comm
+        compute, communication = predict(*fit(resampled), procs, max_load, max_vol)
+        totals.append(compute + np.where(np.asarray(procs) > 1, communication, 0.0))
+    alpha = (1 - confidence) / 2
+    return np.quantile(totals, alpha, axis=0), np.quantile(totals, 1 - alpha, axis=0)
+
+def interpolate_loglog(procs, known_procs, known_values):
+    # log-log interpolation, extrapolated with the slope of the closest segment
+    x, y = np.log2(known_procs), np.log2(np.maximum(known_values, 1))
+    target = np.log2(procs)
+    result = np.interp(target, x, y)
+    if len(x) > 1:
+        low, high = target < x[0], target > x[-1]
+        result[low] = y[0] + (target[low] - x[0]) * (y[1] - y[0]) / (x[1] - x[0])
+        result[high] = y[-1] + (target[high] - x[-1]) * (y[-1] - y[-2]) / (x[-1] - x[-2])
+    return 2 ** result
+
+def structure(series, procs, mtx_path=None):
+    # max_load and max_vol at every process count: exact from the partition
+    # simulation when the matrix is available, interpolated otherwise
+    if mtx_path is not None and os.path.exists(mtx_path):
+        simulated = partition_sim.simulate(mtx_path, procs)
+        return simulated["max_load"].to_numpy(np.float64), simulated["max_vol"].to_numpy(np.float64)
+    series = series.sort_values("procs")
+    parallel = series[series["procs"] > 1]
+    max_load = interpolate_loglog(procs, series["procs"].to_numpy(), series["max_load"].to_numpy())
+    max_vol = interpolate_loglog(procs, parallel["procs"].to_numpy(), parallel["max_vol"].to_numpy())
+    max_vol[np.asarray(procs) == 1] = 0
+    return max_load, max_vol
+
+def model_series(name, series, procs, mtx_path=None, resamples=1000, confidence=0.9, rng=None, weak=False):
+    procs = np.asarray(procs)
+    max_load, max_vol = structure(series, procs, mtx_path)
+    compute_coef, comm_coef = fit(series)
+    compute, comm = predict(compute_coef, comm_coef, procs, max_load, max_vol)
+    comm = np.where(procs > 1, comm, 0.0)
+    total = compute + comm
+    low, high = bootstrap(series, procs, max_load, max_vol, resamples, confidence, rng)
+
+    # speedup over the measured single process time when there is one
+    single = series.loc[series["procs"] == 1, ["computation_time", "communication_time"]].sum(axis=1)
+    t1 = float(single.iloc[0]) if len(single) else float(total[procs == 1][0]) if (procs == 1).any() else np.nan
+
+    df = pd.DataFrame({
+        "matrix_name": name,
+        "procs": procs,
+        "measured": np.isin(procs, series["procs"]),
+        "max_load": max_load,
+        "max_vol": max_vol,
+        "computation_time": compute,
+        "communication_time": comm,
+        "total_time": total,
+        "total_low": low,
+        "total_high": high,
+    })
+    # weak scaling (the work grows with procs): scaled speedup procs * t1 / T
+    # and efficiency t1 / T; strong scaling: t1 / T and speedup / procs
+    scale = df["procs"] if weak else 1
+    df["speedup"] = scale * t1 / df["total_time"]
+    df["speedup_low"] = scale * t1 / df["total_high"]
+    df["speedup_high"] = scale * t1 / df["total_low"]
+    df["efficiency"] = df["speedup"] / df["procs"]
+    coefficients = dict(zip(COMPUTE_TERMS + COMM_TERMS, np.concatenate([compute_coef, comm_coef])))
+    return df, coefficients
+
+def recommend(df, min_efficiency, weak=False):
+    # fastest process count (under weak scaling, where the problem grows with
+    # procs, the one with the highest scaled speedup), and the largest one
+    # still above min_efficiency
+    fastest = df.loc[df["speedup"].idxmax()] if weak else df.loc[df["total_time"].idxmin()]
+    efficient = df[df["efficiency"] >= min_efficiency]
+    economical = efficient.loc[efficient["procs"].idxmax()] if len(efficient) else df.iloc[0]
+    return int(fastest["procs"]), int(economical["procs"])
+
+def plot(df, measured, name, path):
+    fig, ax = plt.subplots(figsize=(8, 6))
+    ax.plot(df["procs"], df["total_time"], color="black", label="Model (total)")
+    ax.fill_between(df["procs"], df["total_low"], df["total_high"], color="gray", alpha=0.3, label="Uncertainty band")
+    ax.plot(df["procs"], df["computation_time"], linestyle="--", label="Model (computation)")
+    ax.plot(df["procs"], df["communication_time"], linestyle=":", label="Model (communication)")
+    ax.scatter(measured["procs"], measured["computation_time"] + measured["communication_time"],
+               color="red", zorder=5, label="Measured")
+    ax.set_xscale("log", base=2)
+    ax.set_yscale("log")
+    ax.set_xlabel("Processes")
+    ax.set_ylabel("Time [ms]")
+    ax.set_title(f"Scaling model: {name}")
+    ax.grid(True, which="both", linestyle="--", alpha=0.4)
+    ax.legend()
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close(fig)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit computation and communication models to measured MPI scaling "
+                                                 "and extrapolate time, speedup and efficiency to other process counts.")
+    parser.add_argument("csv", type=str, nargs="?", default="result/strong_scaling.csv")
+    parser.add_argument("--procs", type=int, nargs="+", default=partition_sim.DEFAULT_PROCS)
+    parser.add_argument("--data-dir", type=str, default="data/real_matrix",
+                        help="where the matrices are: when found, max_load/max_vol come from partition_sim")
+    parser.add_argument("--single-series", action="store_true",
+                        help="fit all the rows as one series (weak scaling, one matrix per process count)")
+    parser.add_argument("--min-efficiency", type=float, default=0.5)
+    parser.add_argument("--confidence", type=float, default=0.9)
+    parser.add_argument("--resamples", type=int, default=1000)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", type=str, default="result/scaling_model.csv")
+    parser.add_argument("--plots", type=str, metavar="DIR", help="save a model vs measured plot per matrix in DIR")
+    args = parser.parse_args()
+
+    measured = pd.read_csv(args.csv)
+    rng = np.random.default_rng(args.seed)
+    series_list = [("all", measured)] if args.single_series else list(measured.groupby("matrix_name", sort=False))
+    if args.plots:
+        os.makedirs(args.plots, exist_ok=True)
+
+    frames = []
+    for name, series in series_list:
+        mtx_path = None if args.single_series else os.path.join(args.data_dir, name)
+        df, coefficients = model_series(name, series, args.procs, mtx_path, args.resamples, args.confidence, rng,
+                                       weak=args.single_series)
+        frames.append(df)
+        fastest, economical = recommend(df, args.min_efficiency, weak=args.single_series)
+        row = df.loc[df["procs"] == fastest].iloc[0]
+        if args.single_series:
+            best = f"highest scaled speedup at {fastest} processes ({row['speedup']:.2f})"
+        else:
+            best = f"fastest at {fastest} processes ({row['total_time']:.3f} ms)"
+        print(f"{name}: " + ", ".join(f"{k} = {v:.3e}" for k, v in coefficients.items()))
+        print(f"  {best}, largest with efficiency >= {args.min_efficiency:.0%}: {economical} processes")
+        if args.plots:
+            plot(df, series, name, os.path.join(args.plots, f"{os.path.splitext(name)[0]}_scaling_model.png"))
+
+    result = pd.concat(frames, ignore_index=True)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    result.to_csv(args.output, index=False, float_format="%.6f")
+    print(f"Saved {len(result)} rows to {args.output}")
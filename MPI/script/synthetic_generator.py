@@ -1,9 +1,25 @@
 #!/usr/bin/env python3
 import os
+import time
 import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+import csr_binary
 
-def write_mtx_fixed_k(path, N, k, rng, vmin = -20.0, vmax = 20.0):
+# Seed contract of write_mtx_fixed_k: for a given (seed, N, k, vmin, vmax) the
+# file is byte-identical on every run. Rows are generated ROWS_PER_BLOCK at a
+# time (columns first, then values), so changing this constant changes the
+# output. Files written before the vectorized writer (e.g. the committed
+# weak-scaling set, --seed 3) are reproduced by --legacy.
+ROWS_PER_BLOCK = 4096
+
+# Weak scaling set: 2^8 ... 2^16 rows. The matrix of EXPONENTS[i] is drawn from
+# child i of SeedSequence(seed).spawn(len(EXPONENTS)), so every file depends
+# only on the seed and its own size (not on which other sizes are generated).
+EXPONENTS = list(range(8, 17))
+
+def write_mtx_fixed_k_legacy(path, N, k, rng, vmin = -20.0, vmax = 20.0):
     if k > N:
         raise ValueError(f"k={k} > N={N} non possibile senza duplicati.")
     nz = N * k
@@ -18,24 +34,383 @@ def write_mtx_fixed_k(path, N, k, rng, vmin = -20.0, vmax = 20.0):
             vals = rng.uniform(vmin, vmax, size=k)
             f.writelines(f"{i} {int(c)} {v:.15g}\n" for c, v in zip(cols, vals))
 
+def sample_columns(rng, n_rows, N, k):
+    # Floyd's algorithm run on all the rows of a block at once: step j draws
+    # t in [0, j] for every row and takes j instead where t was already drawn.
+    # Each row ends up with a uniform k-subset of [0, N), sorted.
+    cols = np.empty((n_rows, k), dtype=np.int64)
+    for i, j in enumerate(range(N - k, N)):
+        t = rng.integers(0, j + 1, size=n_rows)
+        taken = (cols[:, :i] == t[:, None]).any(axis=1)
+        cols[:, i] = np.where(taken, j, t)
+    cols.sort(axis=1)
+    return cols
+
+# ASCII of every 4-digit group, so integers are converted 4 digits per pass
+DIGIT_GROUPS = np.array([list(f"{i:04d}".encode()) for i in range(10000)], dtype=np.uint8)
+
+def ascii_digits(values, out, pad=" "):
+    # Writes into the (n, width) uint8 view `out` the decimal digits of
+    # non-negative integers, right aligned; leading zeros become `pad`
+    # (the last digit is always kept)
+    width = out.shape[1]
+    rest = values.astype(np.int64, copy=True)
+    end = width
+    while end > 0:
+        w = min(4, end)
+        out[:, end - w:end] = DIGIT_GROUPS[rest % 10000][:, 4 - w:]
+        rest //= 10000
+        end -= w
+    if pad != "0" and width > 1:
+        leading = np.logical_and.accumulate(out[:, :-1] == ord("0"), axis=1)
+        out[:, :-1][leading] = ord(pad)
+
+def format_entries(rows, cols, vals, N, int_digits, frac_digits):
+    # Fixed-width "row col value\n" lines built directly as bytes. Indices are
+    # right aligned with spaces and values are written as [sign]II.FFF...F,
+    # which fscanf("%d %d %lg") and any Matrix Market reader accept.
+    index_width = len(str(N))
+    scale = 10 ** frac_digits
+    scaled = np.rint(np.abs(vals) * scale).astype(np.int64)
+
+    # column offsets of every field in a line
+    col_at = index_width + 1
+    sign_at = col_at + index_width + 1
+    dot_at = sign_at + 1 + int_digits
+    line_width = dot_at + 1 + frac_digits + 1
+
+    lines = np.empty((len(vals), line_width), dtype=np.uint8)
+    ascii_digits(rows, lines[:, :index_width])
+    lines[:, index_width] = ord(" ")
+    ascii_digits(cols, lines[:, col_at:col_at + index_width])
+    lines[:, sign_at - 1] = ord(" ")
+    lines[:, sign_at] = np.where(vals < 0, ord("-"), ord(" "))
+    ascii_digits(scaled // scale, lines[:, sign_at + 1:dot_at], pad="0")
+    lines[:, dot_at] = ord(".")
+    ascii_digits(scaled % scale, lines[:, dot_at + 1:line_width - 1], pad="0")
+    lines[:, line_width - 1] = ord("\n")
+    return lines.tobytes()
+
+# Largest row degree sampled with the batched Floyd sampler; longer rows
+# (e.g. power-law hubs) are drawn one by one with rng.choice.
+FLOYD_MAX_K = 64
+
+def sample_variable_columns(rng, degrees, N):
+    # Flat, row-major columns of rows with the given degrees: rows of equal
+    # degree are sampled together, in increasing degree order.
+    offsets = np.concatenate(([0], np.cumsum(degrees)))
+    cols = np.empty(offsets[-1], dtype=np.int64)
+    for d in np.unique(degrees):
+        rows = np.flatnonzero(degrees == d)
+        if d <= FLOYD_MAX_K:
+            sampled = sample_columns(rng, len(rows), N, d)
+        else:
+            sampled = np.array([np.sort(rng.choice(N, size=d, replace=False)) for _ in rows])
+        cols[(offsets[rows][:, None] + np.arange(d)).ravel()] = sampled.ravel()
+    return cols
+
+def grid_shape(N, dims):
+    # (nx, ny[, nz]) with nx * ny * nz == N and sides as close as possible
+    shape = []
+    rest = N
+    for d in range(dims, 1, -1):
+        side = max(int(round(rest ** (1 / d))), 1)
+        while rest % side:
+            side -= 1
+        shape.append(side)
+        rest //= side
+    shape.append(rest)
+    return shape
+
+# Every structure below returns (nz, comment, blocks): blocks lazily yields,
+# ROWS_PER_BLOCK rows at a time, the 0-based (rows, cols) of the entries
+# sorted by row and column, drawing from rng only while being consumed.
+
+def fixed_k_structure(rng, N, k):
+    if k > N:
+        raise ValueError(f"k={k} > N={N} non possibile senza duplicati.")
+
+    def blocks():
+        for start in range(0, N, ROWS_PER_BLOCK):
+            n_rows = min(ROWS_PER_BLOCK, N - start)
+            cols = sample_columns(rng, n_rows, N, k)
+            yield np.repeat(np.arange(start, start + n_rows), k), cols.ravel()
+
+    return N * k, f"synthetic random, fixed nnz per row = {k}", blocks()
+
+def banded_structure(rng, N, bandwidth):
+    # every entry with |i - j| <= bandwidth
+    b = min(bandwidth, N - 1)
+    offsets = np.arange(-b, b + 1)
+
+    def blocks():
+        for start in range(0, N, ROWS_PER_BLOCK):
+            rows = np.arange(start, min(start + ROWS_PER_BLOCK, N))
+            cols = rows[:, None] + offsets
+            valid = (cols >= 0) & (cols < N)
+            yield np.repeat(rows, valid.sum(axis=1)), cols[valid]
+
+    nz = N * (2 * b + 1) - b * (b + 1)
+    return nz, f"synthetic banded, half bandwidth = {b}", blocks()
+
+def power_law_structure(rng, N, k, alpha):
+    # row degrees d >= k with P(d) ~ d^-alpha (discretized Pareto, capped
+    # at N), uniformly random columns
+    if alpha <= 1:
+        raise ValueError(f"alpha={alpha} must be > 1.")
+    degrees = np.floor(k * (1 - rng.random(N)) ** (-1 / (alpha - 1)))
+    degrees = np.minimum(degrees, N).astype(np.int64)
+
+    def blocks():
+        for start in range(0, N, ROWS_PER_BLOCK):
+            block_degrees = degrees[start:start + ROWS_PER_BLOCK]
+            rows = np.repeat(np.arange(start, start + len(block_degrees)), block_degrees)
+            yield rows, sample_variable_columns(rng, block_degrees, N)
+
+    comment = f"synthetic power-law row degrees, min nnz per row = {k}, alpha = {alpha:g}"
+    return int(degrees.sum()), comment, blocks()
+
+def check_block_diagonal(N, k, block_size, off_block):
+    # (entries inside, entries outside) the diagonal block of every row
+    if N % block_size:
+        raise ValueError(f"block size {block_size} does not divide N={N}.")
+    k_off = int(round(k * off_block))
+    k_in = k - k_off
+    if k_in > block_size or k_off > N - block_size:
+        raise ValueError(f"k={k} with off-block fraction {off_block:g} does not fit blocks of {block_size} rows "
+                         f"(N={N}).")
+    return k_in, k_off
+
+def block_diagonal_structure(rng, N, k, block_size, off_block):
+    # k entries per row: round(k * off_block) of them uniformly outside the
+    # diagonal block of the row, the others inside it
+    k_in, k_off = check_block_diagonal(N, k, block_size, off_block)
+
+    def blocks():
+        for start in range(0, N, ROWS_PER_BLOCK):
+            rows = np.arange(start, min(start + ROWS_PER_BLOCK, N))
+            first = (rows // block_size * block_size)[:, None]
+            inside = sample_columns(rng, len(rows), block_size, k_in) + first
+            outside = sample_columns(rng, len(rows), N - block_size, k_off)
+            outside[outside >= first] += block_size
+            cols = np.sort(np.hstack((inside, outside)), axis=1)
+            yield np.repeat(rows, k), cols.ravel()
+
+    comment = f"synthetic block diagonal, block size = {block_size}, nnz per row = {k}, off-block fraction = {off_block:g}"
+    return N * k, comment, blocks()
+
+def stencil_structure(rng, N, dims):
+    # (2 * dims + 1)-point stencil on a grid of N points, x fastest
+    shape = grid_shape(N, dims)
+    strides = np.cumprod([1] + shape[:-1])
+    # neighbours in increasing column order: -z, -y, -x, centre, +x, +y, +z
+    axes = [(a, -1) for a in reversed(range(dims))] + [(None, 0)] + [(a, 1) for a in range(dims)]
+
+    def blocks():
+        for start in range(0, N, ROWS_PER_BLOCK):
+            rows = np.arange(start, min(start + ROWS_PER_BLOCK, N))
+            coords = (rows[:, None] // strides) % shape
+            cols = np.empty((len(rows), len(axes)), dtype=np.int64)
+            valid = np.ones(cols.shape, dtype=bool)
+            for i, (axis, step) in enumerate(axes):
+                if axis is None:
+                    cols[:, i] = rows
+                    continue
+                cols[:, i] = rows + step * strides[axis]
+                valid[:, i] = (coords[:, axis] + step >= 0) & (coords[:, axis] + step < shape[axis])
+            yield np.repeat(rows, valid.sum(axis=1)), cols[valid]
+
+    nz = N * (2 * dims + 1) - sum(2 * N // side for side in shape)
+    comment = f"synthetic {2 * dims + 1}-point stencil on a {'x'.join(map(str, shape))} grid"
+    return nz, comment, blocks()
+
+# family -> (structure, file name suffix), both taking the generation parameters
+FAMILIES = {
+    "fixed": (lambda rng, N, p: fixed_k_structure(rng, N, p["k"]),
+              lambda p: f"K{p['k']}"),
+    "banded": (lambda rng, N, p: banded_structure(rng, N, p["bandwidth"]),
+               lambda p: f"band{p['bandwidth']}"),
+    "powerlaw": (lambda rng, N, p: power_law_structure(rng, N, p["k"], p["alpha"]),
+                 lambda p: f"powerlaw_K{p['k']}_a{p['alpha']:g}"),
+    "blockdiag": (lambda rng, N, p: block_diagonal_structure(rng, N, p["k"], p["block_size"], p["off_block"]),
+                  lambda p: f"blockdiag_K{p['k']}_B{p['block_size']}_off{p['off_block']:g}"),
+    "stencil2d": (lambda rng, N, p: stencil_structure(rng, N, 2),
+                  lambda p: "stencil2d"),
+    "stencil3d": (lambda rng, N, p: stencil_structure(rng, N, 3),
+                  lambda p: "stencil3d"),
+}
+
+def size_params(params, N):
+    # blocks are at most half of the matrix, so that the default block size
+    # also fits the smallest sizes
+    return {**params, "block_size": min(params["block_size"], max(N // 2, 1))}
+
+def matrix_filename(family, N, params):
+    return f"synthetic_{N}x{N}_{FAMILIES[family][1](params)}.mtx"
+
+def write_mtx(path, N, structure, rng, vmin = -20.0, vmax = 20.0, binary_path = None):
+    # Streaming writer shared by all the families: the values of each block
+    # are drawn right after its columns. binary_path: also write the
+    # csr_binary sidecar, holding the values exactly as they are printed in
+    # the .mtx (same doubles once parsed)
+    nz, comment, blocks = structure
+
+    # 15 significant digits for the largest magnitude, as with "%.15g"
+    int_digits = len(str(int(max(abs(vmin), abs(vmax))) + 1))
+    frac_digits = max(15 - int_digits, 1)
+    scale = 10 ** frac_digits
+
+    if binary_path is not None:
+        row_ptr, col_idx, values = csr_binary.create(binary_path, N, N, nz)
+        row_ptr[0] = 0
+    written = 0
+
+    with open(path, "wb") as f:
+        f.write(b"%%MatrixMarket matrix coordinate real general\n")
+        f.write(f"% {comment}\n".encode())
+        f.write(f"{N} {N} {nz}\n".encode())
+
+        for rows, cols in blocks:
+            vals = rng.uniform(vmin, vmax, size=len(cols))
+            f.write(format_entries(rows + 1, cols + 1, vals, N, int_digits, frac_digits))
+
+            if binary_path is not None:
+                block = slice(written, written + len(cols))
+                col_idx[block] = cols
+                values[block] = np.copysign(np.rint(np.abs(vals) * scale) / scale, vals)
+                counts = np.bincount(rows - rows[0], minlength=rows[-1] - rows[0] + 1)
+                row_ptr[rows[0] + 1:rows[-1] + 2] = written + np.cumsum(counts)
+            written += len(cols)
+
+    if written != nz:
+        raise RuntimeError(f"{path}: {written} entries written, {nz} expected.")
+    if binary_path is not None:
+        for array in (row_ptr, col_idx, values):
+            array.flush()
+
+def write_mtx_fixed_k(path, N, k, rng, vmin = -20.0, vmax = 20.0, binary_path = None):
+    write_mtx(path, N, fixed_k_structure(rng, N, k), rng, vmin, vmax, binary_path)
+
+def size_streams(seed):
+    # N -> independent SeedSequence of the matrix with N rows
+    children = np.random.SeedSequence(seed).spawn(len(EXPONENTS))
+    return {2**exp: child for exp, child in zip(EXPONENTS, children)}
+
+def generate_file(path, N, family, params, seed_seq, vmin, vmax, binary=False):
+    rng = np.random.default_rng(seed_seq)
+    structure = FAMILIES[family][0](rng, N, size_params(params, N))
+    binary_path = csr_binary.sidecar_path(path) if binary else None
+    write_mtx(path, N, structure, rng, vmin, vmax, binary_path)
+    return path
+
+def benchmark(exponents, k, seed, legacy_max_exp):
+    print(f"{'N':>8} {'nz':>10} {'legacy rows/s':>15} {'vectorized rows/s':>19}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "bench.mtx")
+        for exp in exponents:
+            N = 2**exp
+
+            start = time.perf_counter()
+            write_mtx_fixed_k(path, N, k, np.random.default_rng(seed))
+            vectorized_rate = N / (time.perf_counter() - start)
+
+            legacy_rate = float("nan")
+            if exp <= legacy_max_exp:
+                start = time.perf_counter()
+                write_mtx_fixed_k_legacy(path, N, k, np.random.default_rng(seed))
+                legacy_rate = N / (time.perf_counter() - start)
+
+            print(f"{N:>8} {N*k:>10} {legacy_rate:>15.0f} {vectorized_rate:>19.0f}")
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--outdir", type=str, default="weak_scaling_mtx")
-    ap.add_argument("--nnz-per-row", type=int, default=32)
+    ap.add_argument("--family", choices=list(FAMILIES), default="fixed",
+                    help="sparsity pattern: uniformly random fixed nnz per row (default), banded, power-law row "
+                         "degrees, block diagonal or 5/7-point stencil")
+    ap.add_argument("--nnz-per-row", type=int, default=32,
+                    help="nnz per row (fixed, blockdiag) or minimum nnz per row (powerlaw)")
+    ap.add_argument("--bandwidth", type=int, default=16, help="half bandwidth of the banded family")
+    ap.add_argument("--alpha", type=float, default=2.5, help="exponent of the row degree distribution of powerlaw")
+    ap.add_argument("--block-size", type=int, default=256, help="rows of each diagonal block of blockdiag")
+    ap.add_argument("--off-block-fraction", type=float, default=0.1,
+                    help="fraction of the nnz of each row placed outside its diagonal block (blockdiag)")
     ap.add_argument("--seed", type=int, default=1)
     ap.add_argument("--vmin", type=float, default=-10.0)
     ap.add_argument("--vmax", type=float, default=10.0)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[2**exp for exp in EXPONENTS],
+                    help="number of rows of the matrices to (re)generate, e.g. --sizes 4096 65536")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                    help="number of matrices written in parallel (default: all cores)")
+    ap.add_argument("--binary", action="store_true",
+                    help="also write the binary CSR sidecar (<name>.csr, see csr_binary.py) of every matrix")
+    ap.add_argument("--legacy", action="store_true",
+                    help="use the original per-row writer (reproduces files generated before the vectorized one)")
+    ap.add_argument("--benchmark", action="store_true",
+                    help="print the rows/s of both writers for every size instead of generating the set")
+    ap.add_argument("--legacy-max-exp", type=int, default=14,
+                    help="largest 2^exp rows timed with the legacy writer in --benchmark")
     args = ap.parse_args()
 
+    if args.benchmark:
+        benchmark(EXPONENTS, args.nnz_per_row, args.seed, args.legacy_max_exp)
+        return
+
+    if args.legacy and args.family != "fixed":
+        ap.error("--legacy only supports the fixed family")
+
+    streams = size_streams(args.seed)
+    unknown = [N for N in args.sizes if N not in streams]
+    if unknown:
+        ap.error(f"unsupported sizes {unknown}, choose among {list(streams)}")
+
     os.makedirs(args.outdir, exist_ok=True)
-    rng = np.random.default_rng(args.seed)
-
-    for exp in range(8, 17):
-        N = 2**exp
-        fn = f"synthetic_{N}x{N}_K{args.nnz_per_row}.mtx"
-        path = os.path.join(args.outdir, fn)
-        print(f"Generating {fn}: N={N}, k={args.nnz_per_row}, nz={N*args.nnz_per_row}")
-        write_mtx_fixed_k(path, N, args.nnz_per_row, rng, args.vmin, args.vmax)
+    k = args.nnz_per_row
+    sizes = sorted(set(args.sizes))
+    params = {"k": k, "bandwidth": args.bandwidth, "alpha": args.alpha,
+              "block_size": args.block_size, "off_block": args.off_block_fraction}
+
+    if args.family == "blockdiag":
+        for N in sizes:
+            p = size_params(params, N)
+            try:
+                check_block_diagonal(N, k, p["block_size"], p["off_block"])
+            except ValueError as e:
+                ap.error(str(e))
+
+    def target(N):
+        fn = matrix_filename(args.family, N, size_params(params, N))
+        print(f"Generating {fn}: N={N}, family={args.family}")
+        return os.path.join(args.outdir, fn)
+
+    if args.legacy:
+        # one rng shared by all the sizes, in increasing order: a file can only
+        # be reproduced together with the smaller ones
+        rng = np.random.default_rng(args.seed)
+        for exp in EXPONENTS:
+            N = 2**exp
+            if N > max(sizes):
+                break
+            path = target(N) if N in sizes else os.devnull
+            write_mtx_fixed_k_legacy(path, N, k, rng, args.vmin, args.vmax)
+            if args.binary and N in sizes:
+                csr_binary.convert(path)
+        return
+
+    if args.jobs <= 1 or len(sizes) == 1:
+        for N in sizes:
+            generate_file(target(N), N, args.family, params, streams[N], args.vmin, args.vmax, args.binary)
+        return
+
+    # largest first, so the wall time is close to the one of the largest file
+    with ProcessPoolExecutor(max_workers=min(args.jobs, len(sizes))) as pool:
+        futures = [
+            pool.submit(generate_file, target(N), N, args.family, params, streams[N],
+                        args.vmin, args.vmax, args.binary)
+            for N in reversed(sizes)
+        ]
+        for future in futures:
+            print(f"Written {future.result()}")
 
 if __name__ == "__main__":
     main()
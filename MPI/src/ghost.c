@@ -14,7 +14,7 @@ int compare_doubles(const void *a, const void *b) {
     return (x > y) - (x < y);
 }
 
-void build_ghost_list(int N, int size, int rank, LocalX *l_x, int *local_row_ptr, int *local_col_idx, int N_local) {
+void build_ghost_list(int N, int size, int rank, LocalX *l_x, int *local_row_ptr, int *local_col_idx, int N_local, RowMap *map) {
 
     int n_ghost = 0, aux = 0;
     bool *is_ghost = calloc(N, sizeof(bool));
@@ -29,7 +29,7 @@ void build_ghost_list(int N, int size, int rank, LocalX *l_x, int *local_row_ptr
 
     // mark as ghost those needed entries that are not owned by this rank
     for(int i = 0; i < N; i++) {
-        if(is_ghost[i] && (i % size != rank)) {
+        if(is_ghost[i] && (map->owner[i] != rank)) {
             n_ghost++;
         }
     }
@@ -41,7 +41,7 @@ void build_ghost_list(int N, int size, int rank, LocalX *l_x, int *local_row_ptr
     // fill ghost_idx onyl with the needed remote indices
     // filled with global indices
     for(int i = 0; i < N; i++) {
-        if(is_ghost[i] && (i % size != rank)) {
+        if(is_ghost[i] && (map->owner[i] != rank)) {
             l_x->ghost_idx[aux++] = i;
         }
     }
@@ -50,7 +50,7 @@ void build_ghost_list(int N, int size, int rank, LocalX *l_x, int *local_row_ptr
     free(is_ghost);
 }
 
-void ghost_exchange(int N, int size, int rank, LocalX *l_x, long long int *n_sends, long long int *n_recvs, double *t0, double *t1) {
+void ghost_exchange(int N, int size, int rank, LocalX *l_x, RowMap *map, long long int *n_sends, long long int *n_recvs, double *t0, double *t1) {
     
     int *send_counts = calloc(size, sizeof(int));
     int *recv_counts = calloc(size, sizeof(int));
@@ -60,7 +60,7 @@ void ghost_exchange(int N, int size, int rank, LocalX *l_x, long long int *n_sen
 
     // group ghost entries by owner
     for(int i = 0; i < l_x->n_ghost; i++) {
-        int owner = l_x->ghost_idx[i] % size;
+        int owner = map->owner[l_x->ghost_idx[i]];
         send_counts[owner]++;
     }
 
@@ -86,7 +86,7 @@ void ghost_exchange(int N, int size, int rank, LocalX *l_x, long long int *n_sen
     }
 
     for(int i = 0; i < l_x->n_ghost; i++) {
-        int owner = l_x->ghost_idx[i] % size;
+        int owner = map->owner[l_x->ghost_idx[i]];
         int pos = position[owner]++;
         send_idx[pos] = l_x->ghost_idx[i];
     }
@@ -100,7 +100,7 @@ void ghost_exchange(int N, int size, int rank, LocalX *l_x, long long int *n_sen
     // note that each element in recv_idx belongs to this rank
     double *send_vals = malloc(recv_tot * sizeof(double));
     for(int i = 0; i < recv_tot; i++) {
-        send_vals[i] = l_x->owned_x[recv_idx[i] / size];
+        send_vals[i] = l_x->owned_x[map->local_idx[recv_idx[i]]];
     }
 
     *n_sends = recv_tot;
@@ -158,7 +158,7 @@ void build_local_x(int N, int N_local, int size, int rank, LocalX *l_x, double *
     }
 }
 
-void remap_column_idx(int N, int size, int rank, int N_local, int *local_col_idx, LocalX *l_x, int local_nz, int *merged_size) {
+void remap_column_idx(int N, int size, int rank, int N_local, int *local_col_idx, LocalX *l_x, RowMap *row_map, int local_nz, int *merged_size) {
     // map the column indices from global to local
     int *map = malloc(N * sizeof(int));
     int local_idx = 0;
@@ -167,9 +167,9 @@ void remap_column_idx(int N, int size, int rank, int N_local, int *local_col_idx
     }
 
     // map the owned entries
-    for(int i = 0; i < N_local; i++) {
-        int global_idx = rank + i * size;
-        if(global_idx < N) map[global_idx] = local_idx++;
+    // (in increasing global order, as in row_map->local_idx)
+    for(int i = 0; i < N; i++) {
+        if(row_map->owner[i] == rank) map[i] = local_idx++;
     }
 
     // map the ghost entries
@@ -5,6 +5,7 @@
 #include "mmio.h"
 #include "csr.h"
 #include "ghost.h"
+#include "partition.h"
 #include "structures.h"
 
 int main(int argc, char* argv[]) {
@@ -17,7 +18,7 @@ int main(int argc, char* argv[]) {
 
     if(argc < 2) {
         if(rank == 0) {
-            fprintf(stderr, "Usage: %s <matrix_file>\n", argv[0]);
+            fprintf(stderr, "Usage: %s <matrix_file> [partition_file]\n", argv[0]);
         }
         MPI_Finalize();
         return EXIT_FAILURE;
@@ -67,6 +68,25 @@ int main(int argc, char* argv[]) {
     MPI_Bcast(&N, 1, MPI_INT, 0, MPI_COMM_WORLD);
     MPI_Bcast(&nz, 1, MPI_INT, 0, MPI_COMM_WORLD);
 
+    // ownership of rows and x entries: cyclic, or read from the partition
+    // file (see script/partition_plan.py) when one is given
+    int n_map = (M > N) ? M : N;
+    int *owner = malloc(n_map * sizeof(int));
+    if(!owner) MPI_Abort(MPI_COMM_WORLD, EXIT_FAILURE);
+    if(rank == 0) {
+        if(argc > 2) {
+            if(M != N || read_partition(argv[2], M, size, owner) != 0) {
+                fprintf(stderr, "Error reading partition file %s\n", argv[2]);
+                MPI_Abort(MPI_COMM_WORLD, EXIT_FAILURE);
+            }
+        } else {
+            cyclic_partition(n_map, size, owner);
+        }
+    }
+    MPI_Bcast(owner, n_map, MPI_INT, 0, MPI_COMM_WORLD);
+    RowMap *row_map = build_row_map(n_map, size, owner);
+    if(!row_map) MPI_Abort(MPI_COMM_WORLD, EXIT_FAILURE);
+
     if(rank == 0) {
         // prepare data for scattering
         send_counts = calloc(size, sizeof(int));
@@ -76,7 +96,7 @@ int main(int argc, char* argv[]) {
         // count the nnz per rank (ownership by row)
         int i, dest;
         for(i = 0; i < nz; i++) {
-            dest = mtx->row_idx[i] % size;
+            dest = row_map->owner[mtx->row_idx[i]];
             send_counts[dest]++;
         }
 
@@ -98,7 +118,7 @@ int main(int argc, char* argv[]) {
             position[i] = displs[i];
         }
         for(i = 0; i < nz; i++) {
-            dest = mtx->row_idx[i] % size;
+            dest = row_map->owner[mtx->row_idx[i]];
             int pos = position[dest]++;
             send_rows[pos] = mtx->row_idx[i];
             send_cols[pos] = mtx->col_idx[i];
@@ -139,15 +159,15 @@ int main(int argc, char* argv[]) {
     int j;
     for(j = 0; j < local_mtx->local_nz; j++) {
         int g = local_mtx->local_row_idx[j];
-        if (g % size != rank) {
+        if (g < 0 || g >= M) {
             fprintf(stderr, "[rank %d] ERROR: global row out of range: %d (M=%d)\n", rank, g, M);
             MPI_Abort(MPI_COMM_WORLD, EXIT_FAILURE);
         }
-        if (g < 0 || g >= M) {
-            fprintf(stderr, "[rank %d] ERROR: row %d belongs to %d\n", rank, g, g % size);
+        if (row_map->owner[g] != rank) {
+            fprintf(stderr, "[rank %d] ERROR: row %d belongs to %d\n", rank, g, row_map->owner[g]);
             MPI_Abort(MPI_COMM_WORLD, EXIT_FAILURE);
         }
-        int aux = g / size;
+        int aux = row_map->local_idx[g];
         local_mtx->local_row_idx[j] = aux;  
         if(aux > max_row) {
             max_row = aux;
@@ -155,7 +175,9 @@ int main(int argc, char* argv[]) {
     }
 
     int N_local = 0;
-    for (int g = rank; g < M; g += size) N_local++;
+    for (int g = 0; g < M; g++) {
+        if (row_map->owner[g] == rank) N_local++;
+    }
 
     for (int j = 0; j < local_mtx->local_nz; j++) {
     int lr = local_mtx->local_row_idx[j];
@@ -185,7 +207,7 @@ int main(int argc, char* argv[]) {
 
         // count how many entries each rank will recieve
         for(int j = 0; j < N; j++) {
-            counts_x[j % size]++;
+            counts_x[row_map->owner[j]]++;
         }
 
         // get displacements
@@ -204,7 +226,7 @@ int main(int argc, char* argv[]) {
             position_x[j] = displs_x[j];
         }
         for(int j = 0; j < N; j++) {
-            int dest = j % size;
+            int dest = row_map->owner[j];
             int pos = position_x[dest]++;
             send_x[pos] = random_vec[j];
         }
@@ -216,11 +238,11 @@ int main(int argc, char* argv[]) {
     MPI_Scatterv(send_x, counts_x, displs_x, MPI_DOUBLE, local_x->owned_x, N_local, MPI_DOUBLE,
                     0, MPI_COMM_WORLD);
 
-    build_ghost_list(N, size, rank, local_x, local_row_ptr, local_mtx->local_col_idx, N_local);
+    build_ghost_list(N, size, rank, local_x, local_row_ptr, local_mtx->local_col_idx, N_local, row_map);
     
     // build the complete local vector (owned + ghost)
     int merged_size = 0;
-    remap_column_idx(N, size, rank, N_local, local_mtx->local_col_idx, local_x, local_mtx->local_nz, &merged_size);
+    remap_column_idx(N, size, rank, N_local, local_mtx->local_col_idx, local_x, row_map, local_mtx->local_nz, &merged_size);
     
     double *merged_local_x = malloc(merged_size * sizeof(double));
     double *local_y = malloc(N_local * sizeof(double));
@@ -264,7 +286,7 @@ int main(int argc, char* argv[]) {
         MPI_Barrier(MPI_COMM_WORLD);
 
         double t0, t1;
-        ghost_exchange(N, size, rank, local_x, &n_sends, &n_recvs, &t0, &t1);
+        ghost_exchange(N, size, rank, local_x, row_map, &n_sends, &n_recvs, &t0, &t1);
 
         build_local_x(N, N_local, size, rank, local_x, merged_local_x);
 
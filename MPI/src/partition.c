@@ -0,0 +1,56 @@
+#include "partition.h"
+
+// partition file written by script/partition_plan.py:
+// a "<rows> <procs>" line followed by the owner rank of every row
+int read_partition(const char *fname, int n, int size, int *owner) {
+    FILE *f;
+    int rows, procs;
+
+    if((f = fopen(fname, "r")) == NULL) {
+        fprintf(stderr, "Error opening partition file %s\n", fname);
+        return -1;
+    }
+
+    if(fscanf(f, "%d %d", &rows, &procs) != 2 || rows != n || procs != size) {
+        fprintf(stderr, "Partition file %s is not for %d rows on %d ranks\n", fname, n, size);
+        fclose(f);
+        return -1;
+    }
+
+    for(int i = 0; i < n; i++) {
+        if(fscanf(f, "%d", &owner[i]) != 1 || owner[i] < 0 || owner[i] >= size) {
+            fprintf(stderr, "Invalid owner of row %d in partition file %s\n", i, fname);
+            fclose(f);
+            return -1;
+        }
+    }
+
+    fclose(f);
+    return 0;
+}
+
+// default distribution: row (and x entry) g belongs to rank g % size
+void cyclic_partition(int n, int size, int *owner) {
+    for(int i = 0; i < n; i++) {
+        owner[i] = i % size;
+    }
+}
+
+RowMap* build_row_map(int n, int size, int *owner) {
+    RowMap *map = malloc(sizeof(RowMap));
+    int *next = calloc(size, sizeof(int));
+    if(!map || !next) return NULL;
+
+    map->owner = owner;
+    map->local_idx = malloc(n * sizeof(int));
+    if(!map->local_idx) return NULL;
+
+    // the entries owned by a rank are stored in increasing global order
+    // (for the cyclic distribution local_idx[g] = g / size)
+    for(int i = 0; i < n; i++) {
+        map->local_idx[i] = next[owner[i]]++;
+    }
+
+    free(next);
+    return map;
+}
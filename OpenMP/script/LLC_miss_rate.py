@@ -2,8 +2,9 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+import columnar
 
-df = pd.read_csv("results/final_results_cache.csv")
+df = columnar.load("results/final_results_cache.csv")
 
 plt.rcParams.update({
     'font.size': 14,           
@@ -15,13 +16,11 @@ plt.rcParams.update({
     'legend.title_fontsize': 16
 })
 
-df['thread_option'] = df['thread_option'].replace('Nan', '1')
-
-df['thread_option'] = pd.to_numeric(df['thread_option'], errors='coerce').astype(int)
+df['thread_option'] = df['thread_option'].fillna(1).astype(int)
 
 df['LLC_Miss_Rate'] = np.where(df['LLC_loads'] > 0, (df['LLC_misses'] / df['LLC_loads']) * 100, 0)
 
-plot_data = df.groupby(['matrix_name', 'nz', 'thread_option'])['LLC_Miss_Rate'].mean().reset_index()
+plot_data = df.groupby(['matrix_name', 'nz', 'thread_option'], observed=True)['LLC_Miss_Rate'].mean().reset_index()
 
 matrix_order = plot_data[['matrix_name', 'nz']].drop_duplicates().sort_values(by='nz')['matrix_name'].tolist()
 
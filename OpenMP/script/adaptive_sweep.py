@@ -0,0 +1,107 @@
+import os
+import time
+import argparse
+import subprocess
+import numpy as np
+import pandas as pd
+import orchestrate
+import repetitions
+import catalog
+
+DATA_DIR = "data"
+TIME_CSV = "results/final_results_time.csv"
+
+THREAD_OPTIONS = [1, 2, 4, 8, 16, 32, 64]
+CHUNK_SIZE_OPTIONS = [1, 10, 100, 1000, 10000]
+SCHEDULING_OPTIONS = ["static", "dynamic", "guided"]
+
+SRC_FILES = ["src/main.c", "src/csr.c", "src/print.c", "src/mmio.c"]
+SEQUENTIAL_BINARY = repetitions.SEQUENTIAL_BINARY
+PARALLEL_BINARY = repetitions.PARALLEL_BINARY
+
+TIME_COLUMNS = ["matrix_name", "rows", "cols", "nz", "compiler_option",
+                "thread_option", "chunk_size_option", "scheduling_option", "exec_time"]
+
+# one row per configuration, next to the raw times (<time csv stem>_reps.csv)
+REPS_COLUMNS = ["matrix_name", "rows", "cols", "nz", "compiler_option",
+                "thread_option", "chunk_size_option", "scheduling_option",
+                "repetitions", "p90_exec_time", "ci_low", "ci_high", "converged"]
+
+def reps_path(csv_path):
+    return os.path.splitext(csv_path)[0] + "_reps.csv"
+
+def build(compiler_option="-O3"):
+    # same compile lines as time_script.sh, one binary per mode
+    subprocess.run(["gcc", "-g", "-Iinclude", compiler_option, *SRC_FILES, "-o", SEQUENTIAL_BINARY], check=True)
+    subprocess.run(["gcc", "-fopenmp", "-g", compiler_option, "-Iinclude", *SRC_FILES, "-o", PARALLEL_BINARY], check=True)
+
+def configurations(matrices, threads, chunks, schedules, sequential=True):
+    # same order as time_script.sh: every sequential run, then the parallel grid
+    if sequential:
+        for mtx_path in matrices:
+            yield mtx_path, None, None, None
+    for mtx_path in matrices:
+        for t in threads:
+            for chunk in chunks:
+                for schedule in schedules:
+                    yield mtx_path, t, schedule, chunk
+
+def write_header(path, columns):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        f.write(",".join(columns) + "\n")
+
+def append_rows(path, rows, columns):
+    # "Nan" for the options of a sequential run, as time_script.sh writes them
+    df = pd.DataFrame(rows, columns=columns)
+    df.to_csv(path, mode="a", header=False, index=False, na_rep="Nan", float_format="%.6f")
+
+def sweep(matrices, output, threads, chunks, schedules, compiler_option="-O3", append=False, seed=None, **options):
+    rng = np.random.default_rng(seed)
+    output_reps = reps_path(output)
+    if not append:
+        write_header(output, TIME_COLUMNS)
+        write_header(output_reps, REPS_COLUMNS)
+
+    dims = {mtx_path: catalog.dims(mtx_path) for mtx_path in matrices}
+    start = time.perf_counter()
+    for mtx_path, t, schedule, chunk in configurations(matrices, threads, chunks, schedules):
+        times, summary = repetitions.measure(mtx_path, t, schedule, chunk, rng=rng, **options)
+        key = [os.path.basename(mtx_path), *dims[mtx_path], compiler_option, t, chunk, schedule]
+
+        append_rows(output, [key + [x] for x in times], TIME_COLUMNS)
+        append_rows(output_reps, [key + list(summary.values())], REPS_COLUMNS)
+
+        label = "sequential" if t is None else f"{t} threads, {schedule}, chunk {chunk}"
+        print(f"{key[0]} ({label}): p90 {summary['p90_exec_time']:.4f} ms "
+              f"[{summary['ci_low']:.4f}, {summary['ci_high']:.4f}] after {summary['repetitions']} runs"
+              f"{'' if summary['converged'] else ' (not converged)'}")
+    print(f"Sweep completed in {time.perf_counter() - start:.1f} s.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time sweep that repeats every configuration, a block of 10 runs at a "
+                                                 "time, until the bootstrap confidence interval of its p90 is narrow enough.")
+    parser.add_argument("mtx", type=str, nargs="*", help="matrices to sweep (default: every .mtx in data/)")
+    parser.add_argument("--output", type=str, default=TIME_CSV)
+    parser.add_argument("--threads", type=int, nargs="+", default=THREAD_OPTIONS)
+    parser.add_argument("--chunks", type=int, nargs="+", default=CHUNK_SIZE_OPTIONS)
+    parser.add_argument("--schedules", nargs="+", choices=SCHEDULING_OPTIONS, default=SCHEDULING_OPTIONS)
+    parser.add_argument("--target", type=float, default=0.05,
+                        help="stop once the CI width is below this fraction of the p90 (default 0.05)")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--min-blocks", type=int, default=1)
+    parser.add_argument("--max-blocks", type=int, default=10, help="upper bound of blocks (of 10 runs) per configuration")
+    parser.add_argument("--resamples", type=int, default=2000)
+    parser.add_argument("--seed", type=int, help="seed of the bootstrap resampling")
+    parser.add_argument("--append", action="store_true", help="append to the output files instead of truncating them")
+    parser.add_argument("--no-build", action="store_true", help="use the existing main and main_seq binaries")
+    args = parser.parse_args()
+
+    matrices = args.mtx or sorted(os.path.join(DATA_DIR, f) for f in os.listdir(DATA_DIR) if f.endswith(".mtx"))
+    os.environ.update(orchestrate.PINNING)
+    if not args.no_build:
+        build()
+
+    sweep(matrices, args.output, args.threads, args.chunks, args.schedules, append=args.append, seed=args.seed,
+          target=args.target, confidence=args.confidence, min_blocks=args.min_blocks,
+          max_blocks=args.max_blocks, resamples=args.resamples)
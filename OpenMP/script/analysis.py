@@ -0,0 +1,133 @@
+import os
+import pickle
+import pandas as pd
+import numpy as np
+import preprocess
+import columnar
+
+TIME_CSV = "results/final_results_time.csv"
+CACHE_DIR = "results/.cache"
+
+# above this size the csv is aggregated chunk by chunk instead of loaded whole
+STREAM_THRESHOLD = 256 * 1024 * 1024
+
+SCHEDULE_ORDER = ["static", "dynamic", "guided"]
+
+def cache_path(csv_path, stat, cache_dir=CACHE_DIR):
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_dir, f"{name}.{stat}.pkl")
+
+def load_aggregated(csv_path=TIME_CSV, stat="p90", cache_dir=CACHE_DIR):
+    # Returns the aggregated block table for csv_path, parsing and aggregating
+    # the csv only when the cached copy no longer matches the source file.
+    # The mtime is checked first; if it moved, the content hash decides.
+    stat_info = os.stat(csv_path)
+    path = cache_path(csv_path, stat, cache_dir)
+
+    cached = None
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                cached = pickle.load(f)
+        except Exception:
+            # unreadable or written by an incompatible pandas version
+            cached = None
+
+    if cached is not None and cached["mtime"] == stat_info.st_mtime_ns and cached["size"] == stat_info.st_size:
+        return cached["table"]
+
+    digest = columnar.file_digest(csv_path)
+    if cached is not None and cached["sha256"] == digest:
+        table = cached["table"]
+    else:
+        print(f"Aggregating {csv_path} ({stat})...")
+        if stat_info.st_size > STREAM_THRESHOLD:
+            table = preprocess.preprocess_csv_stream(csv_path, stat=stat)
+        else:
+            table = preprocess.preprocess_csv(columnar.load(csv_path), stat=stat)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump({
+            "mtime": stat_info.st_mtime_ns,
+            "size": stat_info.st_size,
+            "sha256": digest,
+            "table": table
+        }, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+    return table
+
+class Results:
+    # Read-only accessors over one aggregated table. Parallel rows are indexed
+    # once by (matrix, chunk, schedule, threads) so lookups don't re-filter
+    # the whole frame with boolean masks.
+
+    def __init__(self, table, stat="p90"):
+        self.table = table
+        self.time_col = f"{stat}_exec_time"
+
+        sequential = table[table["scheduling_option"].isna()]
+        self.sequential = sequential.groupby("matrix_name", sort=False, observed=True)[self.time_col].first()
+
+        parallel = table[table["scheduling_option"].notna() & table["thread_option"].notna()]
+        self.parallel = parallel.set_index([
+            "matrix_name", "chunk_size_option", "scheduling_option", "thread_option"
+        ])[self.time_col].sort_index()
+
+    def matrices(self):
+        return list(self.table["matrix_name"].unique())
+
+    def chunk_sizes(self, matrix_name):
+        return sorted(self._matrix(matrix_name).index.get_level_values("chunk_size_option").unique())
+
+    def threads(self, matrix_name, chunk_size=None):
+        data = self._matrix(matrix_name)
+        if chunk_size is not None:
+            data = data[data.index.get_level_values("chunk_size_option") == chunk_size]
+        return sorted(int(t) for t in data.index.get_level_values("thread_option").unique())
+
+    def sequential_baseline(self, matrix_name):
+        # nan when the matrix has no sequential run
+        return float(self.sequential.get(matrix_name, np.nan))
+
+    def times(self, matrix_name, chunk_size, schedule, threads=None):
+        # execution time per thread count, nan where the configuration is missing
+        if threads is None:
+            threads = self.threads(matrix_name, chunk_size)
+        key = (matrix_name, chunk_size, schedule)
+        try:
+            series = self.parallel.loc[key]
+        except KeyError:
+            series = pd.Series(dtype=np.float64)
+        series = series[~series.index.duplicated()]
+        return series.reindex(pd.Index(threads, name="thread_option")).astype(np.float64)
+
+    def speedup_series(self, matrix_name, chunk_size, schedule, threads=None):
+        sequential_time = self.sequential_baseline(matrix_name)
+        times = self.times(matrix_name, chunk_size, schedule, threads)
+        times = times.where(times > 0)
+        return sequential_time / times
+
+    def best_schedule(self, matrix_name, chunk_size, schedules=SCHEDULE_ORDER):
+        # schedule reaching the highest speedup at any thread count,
+        # returned with its speedup series (None, None if nothing is measured)
+        threads = self.threads(matrix_name, chunk_size)
+        best_speedup = -1.0
+        best = (None, None)
+        for schedule in schedules:
+            speedups = self.speedup_series(matrix_name, chunk_size, schedule, threads)
+            if speedups.notna().any() and speedups.max() > best_speedup:
+                best_speedup = speedups.max()
+                best = (schedule, speedups)
+        return best
+
+    def _matrix(self, matrix_name):
+        try:
+            return self.parallel.loc[[matrix_name]]
+        except KeyError:
+            return self.parallel.iloc[:0]
+
+def load(csv_path=TIME_CSV, stat="p90", cache_dir=CACHE_DIR):
+    return Results(load_aggregated(csv_path, stat, cache_dir), stat)
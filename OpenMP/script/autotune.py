@@ -0,0 +1,246 @@
+import os
+import json
+from collections import Counter
+import argparse
+import numpy as np
+import pandas as pd
+import analysis
+
+DATA_DIR = "data"
+FEATURES_CACHE = "results/.cache/features.json"
+
+# Structural features of a matrix. The first three only need rows/cols/nz,
+# so they are also available for matrices of the results csv whose .mtx
+# file is not on disk.
+FEATURES = [
+    "log_rows",         # log10 of the number of rows
+    "log_nz",           # log10 of the number of nonzeros
+    "row_mean",         # mean nonzeros per row
+    "row_cv",           # coefficient of variation of the row lengths
+    "row_max_ratio",    # longest row / mean row length
+    "bandwidth_ratio",  # max |i - j| / cols
+    "col_locality",     # share of consecutive nonzeros of a row on the same 64 byte line of x
+]
+
+X_LINE = 8  # doubles per cache line
+
+def read_coo(mtx_path):
+    # 0-based (rows, cols, row_idx, col_idx) of a coordinate .mtx, entries as stored
+    with open(mtx_path) as f:
+        line = f.readline()
+        while line.startswith("%"):
+            line = f.readline()
+        rows, cols, nz = (int(x) for x in line.split())
+        entries = pd.read_csv(f, sep=r"\s+", header=None, usecols=[0, 1], names=["row", "col"],
+                              comment="%", dtype=np.int64)
+    return rows, cols, entries["row"].to_numpy() - 1, entries["col"].to_numpy() - 1
+
+def dims_features(rows, cols, nz):
+    return {"log_rows": np.log10(rows), "log_nz": np.log10(nz), "row_mean": nz / rows}
+
+def matrix_features(mtx_path):
+    rows, cols, row_idx, col_idx = read_coo(mtx_path)
+    nz = len(row_idx)
+    lengths = np.bincount(row_idx, minlength=rows)
+
+    order = np.lexsort((col_idx, row_idx))
+    r, c = row_idx[order], col_idx[order]
+    same_row = r[1:] == r[:-1]
+    close = (c[1:] // X_LINE) == (c[:-1] // X_LINE)
+
+    features = dims_features(rows, cols, nz)
+    features.update({
+        "row_cv": lengths.std() / lengths.mean(),
+        "row_max_ratio": lengths.max() / lengths.mean(),
+        "bandwidth_ratio": np.abs(row_idx - col_idx).max() / cols,
+        "col_locality": (same_row & close).sum() / max(same_row.sum(), 1),
+    })
+    return {key: float(value) for key, value in features.items()}
+
+def load_features(mtx_paths, cache_path=FEATURES_CACHE):
+    # features of every file, recomputed only when its mtime or size moved
+    cache = {}
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+
+    result = {}
+    changed = False
+    for path in mtx_paths:
+        stat_info = os.stat(path)
+        key = os.path.abspath(path)
+        entry = cache.get(key)
+        if entry is None or entry["mtime"] != stat_info.st_mtime_ns or entry["size"] != stat_info.st_size:
+            print(f"Computing features of {path}...")
+            entry = {"mtime": stat_info.st_mtime_ns, "size": stat_info.st_size, "features": matrix_features(path)}
+            cache[key] = entry
+            changed = True
+        result[path] = entry["features"]
+
+    if changed:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f, indent=1)
+        os.replace(tmp_path, cache_path)
+    return result
+
+def training_features(csv_path, data_dir=DATA_DIR):
+    # one row per matrix of the results: full features when its .mtx is in
+    # data_dir, the rows/cols/nz ones otherwise
+    dims = pd.read_csv(csv_path, usecols=["matrix_name", "rows", "cols", "nz"]).drop_duplicates("matrix_name")
+    on_disk = [os.path.join(data_dir, name) for name in dims["matrix_name"]
+               if os.path.exists(os.path.join(data_dir, name))]
+    computed = load_features(on_disk)
+
+    rows = {}
+    for name, M, N, nz in dims.itertuples(index=False):
+        path = os.path.join(data_dir, name)
+        rows[name] = computed.get(path, dims_features(M, N, nz))
+    return pd.DataFrame.from_dict(rows, orient="index").reindex(columns=FEATURES)
+
+def relative_times(results):
+    # time of every (schedule, chunk) over the best one, per (matrix, threads)
+    times = results.parallel.unstack(["scheduling_option", "chunk_size_option"])
+    times = times[~times.index.duplicated()]
+    return times.div(times.min(axis=1), axis=0)
+
+class Autotuner:
+    # k-nearest-neighbour recommender: the configuration with the lowest
+    # inverse-distance weighted relative time over the k training matrices
+    # closest to the query in standardized feature space.
+
+    def __init__(self, features, relative, k=2):
+        self.features = features
+        self.relative = relative
+        self.k = k
+
+    def neighbours(self, query):
+        usable = [f for f in FEATURES
+                  if pd.notna(query.get(f)) and self.features[f].notna().all() and self.features[f].std() > 0]
+        if not usable:
+            usable = ["log_nz"]
+        train = self.features[usable]
+        mean, std = train.mean(), train.std().replace(0, 1)
+        z_train = (train - mean) / std
+        z_query = (pd.Series({f: query[f] for f in usable}) - mean) / std
+
+        distance = np.sqrt(((z_train - z_query) ** 2).sum(axis=1)).sort_values()
+        nearest = distance.iloc[:self.k]
+        return nearest.index.tolist(), (1.0 / (nearest + 1e-9)).to_numpy()
+
+    def predict(self, query, threads=None):
+        # {threads: (schedule, chunk)}
+        names, weights = self.neighbours(query)
+        available = self.relative.index.get_level_values("thread_option").unique()
+        threads = sorted(available) if threads is None else threads
+
+        recommendation = {}
+        for t in threads:
+            scores = None
+            total = 0.0
+            for name, weight in zip(names, weights):
+                if (name, t) not in self.relative.index:
+                    continue
+                rel = self.relative.loc[(name, t)]
+                scores = weight * rel if scores is None else scores + weight * rel
+                total += weight
+            if scores is not None:
+                schedule, chunk = (scores / total).idxmin()
+                recommendation[int(t)] = (schedule, int(chunk))
+        return recommendation
+
+def best_chunk(results, matrix_name, schedules=analysis.SCHEDULE_ORDER):
+    # measured chunk size reaching the highest speedup of the matrix (any
+    # schedule, any thread count): the one its figures are drawn at
+    best, best_speedup = None, -1.0
+    for chunk in results.chunk_sizes(matrix_name):
+        for schedule in schedules:
+            speedups = results.speedup_series(matrix_name, chunk, schedule)
+            if speedups.notna().any() and speedups.max() > best_speedup:
+                best, best_speedup = int(chunk), speedups.max()
+    return best
+
+def predicted_chunk(results, features, matrix_name, k=2):
+    # chunk size the autotuner recommends for the matrix when left out of the
+    # training set: the most frequent one over the thread counts (ties to the
+    # one of the highest thread count)
+    others = [n for n in features.index if n != matrix_name]
+    relative = relative_times(results)
+    tuner = Autotuner(features.loc[others], relative.drop(index=matrix_name, level="matrix_name"), k)
+    recommendation = tuner.predict(features.loc[matrix_name])
+    chunks = Counter(recommendation[t][1] for t in sorted(recommendation, reverse=True))
+    return chunks.most_common(1)[0][0] if chunks else None
+
+# where plot_speedup.py and class_speedup.py take the chunk size of a matrix from
+CHUNK_SOURCES = ["report", "measured", "predicted"]
+
+def chunk_sizes(results, matrix_names, source="report", report=None, csv_path=analysis.TIME_CSV, data_dir=DATA_DIR):
+    # {matrix: chunk size}: the values the report figures were drawn at, the
+    # measured best or the leave-one-out prediction of the autotuner
+    if source == "report":
+        return {name: report[name] for name in matrix_names}
+    if source == "measured":
+        return {name: best_chunk(results, name) for name in matrix_names}
+    if source == "predicted":
+        features = training_features(csv_path, data_dir)
+        return {name: predicted_chunk(results, features, name) for name in matrix_names}
+    raise ValueError(f"Unknown chunk source '{source}'. Use one of {CHUNK_SOURCES}.")
+
+def evaluate(results, features, k=2):
+    # leave-one-matrix-out: train on the other matrices, predict the held-out one
+    relative = relative_times(results)
+    rows = []
+    for name in features.index:
+        if name not in relative.index.get_level_values("matrix_name"):
+            continue
+        others = [n for n in features.index if n != name]
+        tuner = Autotuner(features.loc[others], relative.drop(index=name, level="matrix_name"), k)
+        for t, (schedule, chunk) in tuner.predict(features.loc[name]).items():
+            measured = relative.loc[(name, t)]
+            best_schedule, best_chunk_size = measured.idxmin()
+            rows.append({
+                "matrix_name": name,
+                "threads": t,
+                "predicted": f"{schedule}/{chunk}",
+                "best": f"{best_schedule}/{int(best_chunk_size)}",
+                "slowdown": measured.get((schedule, chunk), np.nan),
+            })
+    return pd.DataFrame(rows)
+
+def main_arguments(mtx_path, threads, schedule, chunk):
+    return f"./main W {mtx_path} {threads} {schedule} {chunk}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recommend schedule and chunk size per thread count from the "
+                                                 "structure of a matrix, trained on the measured results.")
+    parser.add_argument("mtx", type=str, nargs="*", help="matrices to get a recommendation for")
+    parser.add_argument("--csv", type=str, default=analysis.TIME_CSV)
+    parser.add_argument("--data-dir", type=str, default=DATA_DIR,
+                        help="where the .mtx files of the training matrices are (features fall back to rows/cols/nz)")
+    parser.add_argument("--threads", type=int, nargs="+", help="thread counts (default: all the measured ones)")
+    parser.add_argument("-k", type=int, default=2, help="number of neighbouring training matrices")
+    parser.add_argument("--evaluate", action="store_true",
+                        help="report leave-one-matrix-out accuracy and slowdown against the measured best")
+    args = parser.parse_args()
+
+    results = analysis.load(args.csv)
+    features = training_features(args.csv, args.data_dir)
+
+    if args.evaluate:
+        report = evaluate(results, features, args.k)
+        with pd.option_context("display.width", 200, "display.max_rows", None):
+            print(report.to_string(index=False, float_format="{:.3f}".format))
+        print(f"\nExact match: {(report['predicted'] == report['best']).mean():.1%} of {len(report)} (matrix, threads)")
+        print(f"Slowdown vs best: mean {report['slowdown'].mean():.3f}x, "
+              f"median {report['slowdown'].median():.3f}x, max {report['slowdown'].max():.3f}x")
+
+    tuner = Autotuner(features, relative_times(results), args.k)
+    for path, query in load_features(args.mtx).items():
+        names, _ = tuner.neighbours(query)
+        print(f"\n{path} (closest: {', '.join(names)})")
+        for t, (schedule, chunk) in tuner.predict(query, args.threads).items():
+            print(main_arguments(path, t, schedule, chunk))
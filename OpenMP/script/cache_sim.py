@@ -0,0 +1,231 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import autotune
+import columnar
+import omp_schedule
+
+OUTPUT_CSV = "results/simulated_cache.csv"
+
+LINE_BYTES = 64
+PAGE_BYTES = 4096
+MALLOC_HEADER = 16  # large malloc() blocks start 16 bytes into a fresh page
+
+# element sizes of the arrays main.c touches in the SpMV loop
+ROW_PTR, COL_IDX, VALUES, X, Y = range(5)
+ELEMENT_BYTES = [4, 4, 8, 8, 8]
+
+# same columns as final_results_cache.csv, perf_start is "SIM"
+COLUMNS = ["matrix_name", "rows", "cols", "nz", "compiler_option", "thread_option",
+           "chunk_size_option", "scheduling_option", "perf_start", "L1_loads", "L1_misses",
+           "LLC_loads", "LLC_misses"]
+
+class Level:
+    # set-associative LRU cache, private to every thread or shared by all
+
+    def __init__(self, name, size, assoc, shared, line=LINE_BYTES):
+        self.name = name
+        self.size = size
+        self.assoc = assoc
+        self.shared = shared
+        self.line = line
+        self.n_sets = size // (assoc * line)
+
+def parse_size(text):
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    text = text.upper().rstrip("B")
+    return int(float(text[:-1]) * units[text[-1]]) if text[-1] in units else int(text)
+
+def parse_level(name, spec, shared):
+    # "32K:8" -> 32 KiB, 8 ways
+    size, assoc = spec.split(":")
+    return Level(name, parse_size(size), int(assoc), shared)
+
+def load_csr(mtx_path):
+    # (rows, cols, row_ptr, col_idx) as COOtoCSR builds them: sorted by row, then column
+    rows, cols, row_idx, col_idx = autotune.read_coo(mtx_path)
+    order = np.lexsort((col_idx, row_idx))
+    row_ptr = np.zeros(rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(row_idx, minlength=rows), out=row_ptr[1:])
+    return rows, cols, row_ptr, col_idx[order]
+
+def array_bases(rows, cols, nz):
+    # byte address of every array, each in its own page-aligned block
+    sizes = [(rows + 1) * 4, nz * 4, nz * 8, cols * 8, rows * 8]
+    bases = []
+    address = 0
+    for size in sizes:
+        bases.append(address + MALLOC_HEADER)
+        address += (MALLOC_HEADER + size + PAGE_BYTES - 1) // PAGE_BYTES * PAGE_BYTES + PAGE_BYTES
+    return np.array(bases, dtype=np.int64)
+
+def trace(rows_order, row_ptr, col_idx, bases):
+    # Byte addresses and load flags of the loop of main.c over rows_order:
+    # per row a load of row_ptr[k+1], then val[j], J[j], vec[J[j]-1] for
+    # every nonzero, then the store of result[k].
+    lengths = row_ptr[rows_order + 1] - row_ptr[rows_order]
+    per_row = 3 * lengths + 2
+    row_start = np.cumsum(per_row) - per_row
+    n = int(per_row.sum())
+
+    address = np.empty(n, dtype=np.int64)
+    load = np.ones(n, dtype=bool)
+
+    address[row_start] = bases[ROW_PTR] + (rows_order + 1) * ELEMENT_BYTES[ROW_PTR]
+    row_end = row_start + per_row - 1
+    address[row_end] = bases[Y] + rows_order * ELEMENT_BYTES[Y]
+    load[row_end] = False
+
+    # j of every nonzero in execution order, and its slot in the trace
+    nnz = int(lengths.sum())
+    first = np.repeat(row_ptr[rows_order], lengths)
+    within = np.arange(nnz, dtype=np.int64) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    j = first + within
+    slot = np.repeat(row_start + 1, lengths) + 3 * within
+
+    address[slot] = bases[VALUES] + j * ELEMENT_BYTES[VALUES]
+    address[slot + 1] = bases[COL_IDX] + j * ELEMENT_BYTES[COL_IDX]
+    address[slot + 2] = bases[X] + col_idx[j] * ELEMENT_BYTES[X]
+    return address, load
+
+def lru_hits(set_idx, tags, n_sets, assoc):
+    # Hit flag of every access (given in time order) to a set-associative
+    # LRU cache. Sets are independent, so the k-th access of every set is
+    # simulated at once: the loop runs over the longest set history, each
+    # step a vector operation over all the sets.
+    n = len(set_idx)
+    order = np.argsort(set_idx, kind="stable")
+    counts = np.bincount(set_idx, minlength=n_sets)
+    position = np.arange(n, dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+    step_order = order[np.argsort(position, kind="stable")]
+    step_sizes = np.bincount(position)
+
+    cached = np.full((n_sets, assoc), -1, dtype=np.int64)
+    last_use = np.full((n_sets, assoc), -1, dtype=np.int64)
+    hits = np.zeros(n, dtype=bool)
+
+    start = 0
+    for step, size in enumerate(step_sizes):
+        selected = step_order[start:start + size]
+        start += size
+        s = set_idx[selected]
+        t = tags[selected]
+        match = cached[s] == t[:, None]
+        hit = match.any(axis=1)
+        way = np.where(hit, match.argmax(axis=1), last_use[s].argmin(axis=1))
+        cached[s, way] = t
+        last_use[s, way] = step
+        hits[selected] = hit
+    return hits
+
+def simulate_level(level, lines, thread):
+    if level.shared:
+        set_idx = lines % level.n_sets
+    else:
+        set_idx = thread * level.n_sets + lines % level.n_sets
+    n_sets = level.n_sets * (1 if level.shared else int(thread.max()) + 1)
+    return lru_hits(set_idx, lines // level.n_sets, n_sets, level.assoc)
+
+def simulate(rows, cols, row_ptr, col_idx, schedule, chunk, threads, levels, iterations=1):
+    # Loads and load misses of every level for one configuration. Threads
+    # advance at the same pace: shared levels see the accesses ordered by
+    # their position in each thread's trace. With iterations > 1 the SpMV is
+    # repeated and only the last one is counted (warm caches).
+    row_cost = np.diff(row_ptr) + 1
+    bounds, owner, _, _ = omp_schedule.assign(row_cost, schedule, chunk, threads)
+    bases = array_bases(rows, cols, len(col_idx))
+
+    addresses, loads, thread_of, local = [], [], [], []
+    for t, rows_order in enumerate(omp_schedule.thread_rows(bounds, owner, threads)):
+        address, load = trace(rows_order, row_ptr, col_idx, bases)
+        address = np.tile(address, iterations)
+        load = np.tile(load, iterations)
+        addresses.append(address)
+        loads.append(load)
+        thread_of.append(np.full(len(address), t, dtype=np.int64))
+        local.append(np.arange(len(address), dtype=np.int64))
+
+    order = np.lexsort((np.concatenate(thread_of), np.concatenate(local)))
+    lines = (np.concatenate(addresses) // LINE_BYTES)[order]
+    load = np.concatenate(loads)[order]
+    thread = np.concatenate(thread_of)[order]
+    counted = np.concatenate(local)[order] >= np.repeat([len(a) // iterations * (iterations - 1) for a in addresses],
+                                                        [len(a) for a in addresses])[order]
+
+    stats = {}
+    reaching = np.ones(len(lines), dtype=bool)
+    for level in levels:
+        hits = simulate_level(level, lines[reaching], thread[reaching])
+        counted_loads = (load & counted)[reaching]
+        stats[f"{level.name}_loads"] = int(counted_loads.sum())
+        stats[f"{level.name}_misses"] = int((counted_loads & ~hits).sum())
+        misses = np.zeros(len(lines), dtype=bool)
+        misses[reaching] = ~hits
+        reaching = misses
+    return stats
+
+def simulate_matrix(mtx_path, configs, levels, iterations=1):
+    rows, cols, row_ptr, col_idx = load_csr(mtx_path)
+    matrix_name = os.path.basename(mtx_path)
+    result = []
+    for threads, chunk, schedule in configs:
+        stats = simulate(rows, cols, row_ptr, col_idx, schedule, chunk, threads, levels, iterations)
+        result.append({
+            "matrix_name": matrix_name, "rows": rows, "cols": cols, "nz": len(col_idx),
+            "compiler_option": "-O3", "thread_option": threads, "chunk_size_option": chunk,
+            "scheduling_option": schedule, "perf_start": "SIM",
+            "L1_loads": stats["L1_loads"], "L1_misses": stats["L1_misses"],
+            "LLC_loads": stats["LLC_loads"], "LLC_misses": stats["LLC_misses"],
+        })
+        print(f"{matrix_name} ({threads} threads, {schedule}, chunk {chunk}): "
+              f"L1 miss rate {stats['L1_misses'] / max(stats['L1_loads'], 1):.2%}, "
+              f"LLC miss rate {stats['LLC_misses'] / max(stats['LLC_loads'], 1):.2%}")
+    return pd.DataFrame(result, columns=COLUMNS)
+
+def compare(predicted, cache_csv):
+    # miss rates of the simulation next to the perf measurements of the same configurations
+    keys = ["matrix_name", "thread_option", "chunk_size_option", "scheduling_option"]
+    measured = columnar.load(cache_csv).astype({"matrix_name": str, "scheduling_option": str})
+    merged = predicted.astype({"matrix_name": str}).merge(measured, on=keys, suffixes=("", "_measured"))
+    if merged.empty:
+        print(f"No simulated configuration found in {cache_csv}.")
+        return
+    for suffix in ["", "_measured"]:
+        merged[f"L1_miss_rate{suffix}"] = merged[f"L1_misses{suffix}"] / merged[f"L1_loads{suffix}"]
+        merged[f"LLC_miss_rate{suffix}"] = merged[f"LLC_misses{suffix}"] / merged[f"LLC_loads{suffix}"]
+    columns = keys + ["L1_miss_rate", "L1_miss_rate_measured", "LLC_miss_rate", "LLC_miss_rate_measured"]
+    with pd.option_context("display.width", 200, "display.max_rows", None):
+        print(merged[columns].to_string(index=False, float_format="{:.4f}".format))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Predict L1/LLC loads and misses of the CSR SpMV of main.c by replaying "
+                                                 "its access stream through set-associative LRU caches.")
+    parser.add_argument("mtx", type=str, nargs="+")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1])
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1])
+    parser.add_argument("--schedules", nargs="+", choices=omp_schedule.SCHEDULES, default=["static"])
+    parser.add_argument("--l1", type=str, default="48K:12", help="size:ways of the private L1 (default 48K:12)")
+    parser.add_argument("--l2", type=str, help="size:ways of a private L2 between L1 and LLC (e.g. 2M:16)")
+    parser.add_argument("--llc", type=str, default="32M:16", help="size:ways of the shared LLC (default 32M:16)")
+    parser.add_argument("--iterations", type=int, default=1,
+                        help="SpMV repetitions, only the last one counted (1 = cold caches, as perf C-N)")
+    parser.add_argument("--output", type=str, default=OUTPUT_CSV)
+    parser.add_argument("--compare", type=str, metavar="CSV",
+                        help="measured cache results (e.g. results/final_results_cache.csv) to print next to the prediction")
+    args = parser.parse_args()
+
+    levels = [parse_level("L1", args.l1, shared=False)]
+    if args.l2:
+        levels.append(parse_level("L2", args.l2, shared=False))
+    levels.append(parse_level("LLC", args.llc, shared=True))
+
+    configs = [(t, c, s) for t in args.threads for c in args.chunks for s in args.schedules]
+    predicted = pd.concat([simulate_matrix(m, configs, levels, args.iterations) for m in args.mtx], ignore_index=True)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    predicted.to_csv(args.output, index=False)
+    print(f"Saved {len(predicted)} rows to {args.output}")
+
+    if args.compare:
+        compare(predicted, args.compare)
@@ -0,0 +1,286 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+
+# Standard library only, as orchestrate.py: dimensions, banner and hash are
+# read everywhere; the structural statistics (row length histogram,
+# bandwidth, symmetry) need numpy and are left empty where it is missing,
+# to be filled by the next refresh that has it.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# One catalog for both halves of the repository, found from this file so that
+# the MPI scripts (run from MPI/) share it with the OpenMP ones.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+CATALOG_DB = os.path.join(ROOT, "OpenMP", "results", ".cache", "catalog.sqlite")
+DATA_DIRS = [os.path.join(ROOT, "OpenMP", "data"), os.path.join(ROOT, "MPI", "data")]
+
+HASH_BLOCK = 1 << 24
+PARSE_LINES = 1 << 22  # entries parsed at a time
+
+# (name, sqlite type); path is the absolute path of the file
+COLUMNS = [
+    ("path", "TEXT PRIMARY KEY"), ("matrix_name", "TEXT"), ("size", "INTEGER"), ("mtime_ns", "INTEGER"),
+    ("sha256", "TEXT"), ("field", "TEXT"), ("symmetry", "TEXT"),
+    ("rows", "INTEGER"), ("cols", "INTEGER"), ("nz", "INTEGER"),
+    ("row_min", "INTEGER"), ("row_max", "INTEGER"), ("row_mean", "REAL"), ("row_std", "REAL"),
+    ("empty_rows", "INTEGER"), ("row_histogram", "TEXT"), ("bandwidth", "INTEGER"), ("profile", "INTEGER"),
+    ("pattern_symmetry", "REAL"), ("value_symmetry", "REAL"), ("scanned_at", "REAL"),
+]
+NAMES = [name for name, _ in COLUMNS]
+STRUCTURE = NAMES[NAMES.index("row_min"):NAMES.index("scanned_at")]
+
+def connect(db_path=CATALOG_DB):
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    db = sqlite3.connect(db_path, timeout=60)
+    db.row_factory = sqlite3.Row
+    db.execute(f"CREATE TABLE IF NOT EXISTS matrices ({', '.join(f'{n} {t}' for n, t in COLUMNS)})")
+    db.execute("CREATE INDEX IF NOT EXISTS matrices_name ON matrices (matrix_name)")
+    db.execute("CREATE INDEX IF NOT EXISTS matrices_sha256 ON matrices (sha256)")
+    return db
+
+def header(mtx_path):
+    # (field, symmetry, rows, cols, nz) from the banner and the size line
+    with open(mtx_path) as f:
+        banner = f.readline().lower().split()
+        for line in f:
+            if not line.startswith("%"):
+                rows, cols, nz = (int(x) for x in line.split())
+                field = banner[3] if len(banner) > 3 else "real"
+                symmetry = banner[4] if len(banner) > 4 else "general"
+                return field, symmetry, rows, cols, nz
+    raise ValueError(f"{mtx_path}: missing size line.")
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def read_entries(mtx_path, nz):
+    # 0-based rows, columns and values, parsed PARSE_LINES lines at a time
+    # (pattern files get values of 1)
+    row_idx = np.empty(nz, dtype=np.int64)
+    col_idx = np.empty(nz, dtype=np.int64)
+    values = np.ones(nz, dtype=np.float64)
+    with open(mtx_path) as f:
+        line = f.readline()
+        while line.startswith("%"):
+            line = f.readline()
+        done = 0
+        while done < nz:
+            lines = [l for l in f.readlines(PARSE_LINES * 32) if not l.startswith("%")]
+            if not lines:
+                break
+            width = len(lines[0].split())
+            block = np.array(" ".join(lines).split(), dtype=np.float64).reshape(-1, width)
+            n = len(block)
+            row_idx[done:done + n] = block[:, 0].astype(np.int64) - 1
+            col_idx[done:done + n] = block[:, 1].astype(np.int64) - 1
+            if width > 2:
+                values[done:done + n] = block[:, 2]
+            done += n
+    if done != nz:
+        raise ValueError(f"{mtx_path}: header declares {nz} entries, found {done}.")
+    return row_idx, col_idx, values
+
+def structure(mtx_path, rows, cols, nz, symmetry):
+    # Statistics of the stored entries. The row length histogram counts the
+    # empty rows, then rows with [1, 2), [2, 4), [4, 8), ... nonzeros.
+    # pattern_symmetry is the share of off-diagonal entries whose transpose is
+    # stored too (value_symmetry: with the same value); 1 for symmetric files.
+    row_idx, col_idx, values = read_entries(mtx_path, nz)
+    lengths = np.bincount(row_idx, minlength=rows)
+    buckets = np.where(lengths > 0, np.floor(np.log2(np.maximum(lengths, 1))).astype(np.int64) + 1, 0)
+    histogram = np.bincount(buckets).tolist()
+
+    stats = {
+        "row_min": int(lengths.min()) if rows else 0,
+        "row_max": int(lengths.max()) if rows else 0,
+        "row_mean": float(lengths.mean()) if rows else 0.0,
+        "row_std": float(lengths.std()) if rows else 0.0,
+        "empty_rows": int((lengths == 0).sum()),
+        "row_histogram": json.dumps(histogram),
+        "bandwidth": int(np.abs(row_idx - col_idx).max()) if nz else 0,
+    }
+    first = np.full(rows, cols, dtype=np.int64)
+    np.minimum.at(first, row_idx, col_idx)
+    stats["profile"] = int(np.maximum(np.arange(rows) - first, 0)[lengths > 0].sum())
+
+    off = row_idx != col_idx
+    if symmetry != "general" or rows != cols:
+        stats["pattern_symmetry"] = stats["value_symmetry"] = 1.0 if symmetry != "general" else 0.0
+    elif not off.any():
+        stats["pattern_symmetry"] = stats["value_symmetry"] = 1.0
+    else:
+        keys = row_idx * cols + col_idx
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        transposed = (col_idx * cols + row_idx)[off]
+        at = np.minimum(np.searchsorted(sorted_keys, transposed), nz - 1)
+        found = sorted_keys[at] == transposed
+        same = found & (values[order][at] == values[off])
+        stats["pattern_symmetry"] = float(found.mean())
+        stats["value_symmetry"] = float(same.mean())
+    return stats
+
+def in_dirs(path, dirs, recursive=True):
+    # whether path is below one of dirs (directly inside one if not recursive)
+    for directory in dirs:
+        root = os.path.abspath(directory)
+        if os.path.dirname(path) == root or (recursive and path.startswith(root + os.sep)):
+            return True
+    return False
+
+def matrix_files(dirs, recursive=True):
+    # every .mtx below dirs (or directly inside them), as absolute paths
+    paths = []
+    for directory in dirs:
+        for dirpath, _, filenames in os.walk(directory):
+            paths.extend(os.path.abspath(os.path.join(dirpath, name)) for name in filenames if name.endswith(".mtx"))
+            if not recursive:
+                break
+    return sorted(paths)
+
+def refresh(dirs=DATA_DIRS, db_path=CATALOG_DB, with_structure=True, verbose=True, recursive=True):
+    # Brings the entries of the .mtx files below dirs up to date: files whose
+    # size and mtime did not move are skipped, the others are hashed and only
+    # rescanned if the hash changed (or the structure was never computed).
+    # Entries of files that disappeared from dirs are dropped.
+    with_structure = with_structure and np is not None
+    db = connect(db_path)
+    known = {row["path"]: dict(row) for row in db.execute("SELECT * FROM matrices")}
+    counts = {"added": 0, "updated": 0, "touched": 0, "unchanged": 0, "removed": 0}
+
+    paths = matrix_files(dirs, recursive)
+    for path in paths:
+        stat_info = os.stat(path)
+        entry = known.get(path)
+        moved = entry is None or entry["size"] != stat_info.st_size or entry["mtime_ns"] != stat_info.st_mtime_ns
+        missing = with_structure and (entry is None or entry["scanned_at"] is None)
+        if not moved and not missing:
+            counts["unchanged"] += 1
+            continue
+
+        digest = file_hash(path)
+        if entry is not None and entry["sha256"] == digest and not missing:
+            # same content (copied, touched): only the stat fields change
+            db.execute("UPDATE matrices SET size = ?, mtime_ns = ? WHERE path = ?",
+                       (stat_info.st_size, stat_info.st_mtime_ns, path))
+            counts["touched"] += 1
+            continue
+
+        if verbose:
+            print(f"Scanning {path}...")
+        field, symmetry, rows, cols, nz = header(path)
+        record = dict.fromkeys(NAMES)
+        record.update({"path": path, "matrix_name": os.path.basename(path), "size": stat_info.st_size,
+                       "mtime_ns": stat_info.st_mtime_ns, "sha256": digest, "field": field,
+                       "symmetry": symmetry, "rows": rows, "cols": cols, "nz": nz})
+        if with_structure:
+            record.update(structure(path, rows, cols, nz, symmetry))
+            record["scanned_at"] = time.time()
+        db.execute(f"INSERT OR REPLACE INTO matrices ({', '.join(NAMES)}) VALUES ({', '.join('?' * len(NAMES))})",
+                   [record[name] for name in NAMES])
+        counts["added" if entry is None else "updated"] += 1
+
+    for path in known.keys() - set(paths):
+        if in_dirs(path, dirs, recursive):
+            db.execute("DELETE FROM matrices WHERE path = ?", (path,))
+            counts["removed"] += 1
+
+    db.commit()
+    db.close()
+    return counts
+
+def get(matrix, db_path=CATALOG_DB):
+    # entry of a .mtx path, or of a matrix name (first match), or None
+    db = connect(db_path)
+    if os.path.exists(matrix):
+        row = db.execute("SELECT * FROM matrices WHERE path = ?", (os.path.abspath(matrix),)).fetchone()
+    else:
+        row = db.execute("SELECT * FROM matrices WHERE matrix_name = ? ORDER BY path", (matrix,)).fetchone()
+    db.close()
+    if row is None:
+        return None
+    entry = dict(row)
+    entry["row_histogram"] = json.loads(entry["row_histogram"]) if entry["row_histogram"] else None
+    return entry
+
+def entries(dirs=None, db_path=CATALOG_DB, recursive=True):
+    # every entry, or those below dirs (directly inside them if not recursive), sorted by path
+    db = connect(db_path)
+    rows = [dict(row) for row in db.execute("SELECT * FROM matrices ORDER BY path")]
+    db.close()
+    if dirs:
+        rows = [row for row in rows if in_dirs(row["path"], dirs, recursive)]
+    return rows
+
+def dims(mtx_path, db_path=CATALOG_DB):
+    # (rows, cols, nz) from the catalog when its entry is current, from the header otherwise
+    stat_info = os.stat(mtx_path)
+    entry = get(mtx_path, db_path) if os.path.exists(db_path) else None
+    if entry is not None and entry["size"] == stat_info.st_size and entry["mtime_ns"] == stat_info.st_mtime_ns:
+        return entry["rows"], entry["cols"], entry["nz"]
+    return header(mtx_path)[2:]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Catalog of the local matrices: dimensions, row length histogram, "
+                                                 "bandwidth, symmetry and hash, refreshed incrementally.")
+    parser.add_argument("--db", type=str, default=CATALOG_DB)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    refresh_parser = subparsers.add_parser("refresh", help="scan new or changed .mtx files")
+    refresh_parser.add_argument("dirs", type=str, nargs="*", default=DATA_DIRS)
+    refresh_parser.add_argument("--header-only", action="store_true",
+                                help="only dimensions, banner and hash (no numpy needed)")
+    refresh_parser.add_argument("--top-level", action="store_true", help="skip the subfolders of dirs")
+
+    list_parser = subparsers.add_parser("list", help="print the entries below dirs (all by default)")
+    list_parser.add_argument("dirs", type=str, nargs="*")
+    list_parser.add_argument("--columns", nargs="+", choices=NAMES,
+                             default=["matrix_name", "rows", "cols", "nz", "bandwidth", "pattern_symmetry"])
+    list_parser.add_argument("--csv", action="store_true", help="comma separated, no header (for the bash scripts)")
+    list_parser.add_argument("--refresh", action="store_true", help="refresh dirs first")
+    list_parser.add_argument("--header-only", action="store_true",
+                             help="with --refresh, only dimensions, banner and hash (no structural scan)")
+    list_parser.add_argument("--top-level", action="store_true",
+                             help="only the files directly inside dirs, as the *.mtx glob of the bash scripts")
+
+    show_parser = subparsers.add_parser("show", help="print the entry of a matrix (path or name)")
+    show_parser.add_argument("matrix", type=str)
+    show_parser.add_argument("--field", choices=NAMES, help="print only this field")
+    args = parser.parse_args()
+
+    if args.command == "refresh" or (args.command == "list" and args.refresh):
+        dirs = args.dirs or DATA_DIRS
+        with_structure = not args.header_only
+        if with_structure and np is None:
+            print("numpy not available: only dimensions, banner and hash are cataloged.", file=sys.stderr)
+        counts = refresh(dirs, args.db, with_structure, verbose=args.command == "refresh",
+                         recursive=not args.top_level)
+        if args.command == "refresh":
+            print(", ".join(f"{n} {k}" for k, n in counts.items()) + f" in {args.db}")
+
+    if args.command == "list":
+        for entry in entries(args.dirs, args.db, recursive=not args.top_level):
+            entry["path"] = os.path.relpath(entry["path"])
+            values = ["" if entry[c] is None else str(entry[c]) for c in args.columns]
+            print(",".join(values) if args.csv else "  ".join(values))
+
+    elif args.command == "show":
+        entry = get(args.matrix, args.db)
+        if entry is None:
+            sys.exit(f"{args.matrix} is not in the catalog (run refresh first).")
+        if args.field:
+            print(entry[args.field])
+        else:
+            for name in NAMES:
+                print(f"{name:>16}: {entry[name]}")
@@ -0,0 +1,133 @@
+import os
+import math
+import argparse
+import pandas as pd
+import adaptive_sweep
+import repetitions
+import orchestrate
+
+OUTPUT_CSV = "results/chunk_search.csv"
+
+# the grid of time_script.sh, the search is compared against its best point
+GRID_CHUNKS = adaptive_sweep.CHUNK_SIZE_OPTIONS
+
+INV_PHI = (math.sqrt(5) - 1) / 2
+
+class ChunkObjective:
+    # p90 of a block of runs of main at a chunk size, memoized on the integer
+    # chunk: the search works on log10(chunk), but nearby points round to the
+    # same chunk and are not measured twice.
+
+    def __init__(self, mtx_path, threads, schedule):
+        self.mtx_path = mtx_path
+        self.threads = threads
+        self.schedule = schedule
+        self.measured = {}
+
+    def __call__(self, chunk):
+        chunk = max(1, int(round(chunk)))
+        if chunk not in self.measured:
+            block = repetitions.run_block(self.mtx_path, self.threads, self.schedule, chunk)
+            self.measured[chunk] = repetitions.p90(block)
+        return self.measured[chunk]
+
+    def best(self, chunks=None):
+        candidates = self.measured if chunks is None else {c: self.measured[c] for c in chunks}
+        chunk = min(candidates, key=candidates.get)
+        return chunk, candidates[chunk]
+
+def golden_section(objective, lo, hi, max_evals, tol=0.05):
+    # Minimizes objective(10**x) over x in [lo, hi] (decades of chunk size),
+    # until the bracket is narrower than tol decades or max_evals distinct
+    # chunk sizes have been measured.
+    start = len(objective.measured)
+    a, b = lo, hi
+    c = b - INV_PHI * (b - a)
+    d = a + INV_PHI * (b - a)
+    fc, fd = objective(10 ** c), objective(10 ** d)
+    while b - a > tol and len(objective.measured) - start < max_evals:
+        if round(10 ** c) == round(10 ** d):
+            break
+        if fc < fd:
+            b, d, fd = d, c, fc
+            c = b - INV_PHI * (b - a)
+            fc = objective(10 ** c)
+        else:
+            a, c, fc = c, d, fd
+            d = a + INV_PHI * (b - a)
+            fd = objective(10 ** d)
+    return objective.best()
+
+def search(mtx_path, schedule, threads, max_chunk, max_evals, warm_span=1.0, grid=True):
+    # One search per thread count, in increasing order; from the second one
+    # on the bracket is centered on the optimum of the previous thread count
+    # (warm_span decades each side) instead of covering the whole range.
+    lo, hi = 0.0, math.log10(max_chunk)
+    previous = None
+    rows = []
+    for t in threads:
+        objective = ChunkObjective(mtx_path, t, schedule)
+        a, b = lo, hi
+        if previous is not None:
+            center = math.log10(previous)
+            a, b = max(lo, center - warm_span), min(hi, center + warm_span)
+        chunk, p90 = golden_section(objective, a, b, max_evals)
+        evaluations = len(objective.measured)
+
+        row = {
+            "matrix_name": os.path.basename(mtx_path),
+            "threads": t,
+            "schedule": schedule,
+            "chunk": chunk,
+            "p90_exec_time": p90,
+            "evaluations": evaluations,
+        }
+        if grid:
+            # grid points not met by the search are measured on top of it
+            for grid_chunk in GRID_CHUNKS:
+                objective(grid_chunk)
+            grid_chunk, grid_p90 = objective.best(GRID_CHUNKS)
+            row.update({
+                "grid_chunk": grid_chunk,
+                "grid_p90_exec_time": grid_p90,
+                "improvement": grid_p90 / p90 - 1,
+            })
+        rows.append(row)
+        previous = chunk
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Golden-section search of the chunk size, on a log scale, per "
+                                                 "(matrix, schedule, threads), compared with the best point of the grid.")
+    parser.add_argument("mtx", type=str, nargs="+")
+    parser.add_argument("--threads", type=int, nargs="+", default=adaptive_sweep.THREAD_OPTIONS)
+    parser.add_argument("--schedules", nargs="+", choices=adaptive_sweep.SCHEDULING_OPTIONS,
+                        default=adaptive_sweep.SCHEDULING_OPTIONS)
+    parser.add_argument("--max-chunk", type=int, default=max(GRID_CHUNKS))
+    parser.add_argument("--max-evals", type=int, default=8, help="chunk sizes measured per search")
+    parser.add_argument("--warm-span", type=float, default=1.0,
+                        help="decades each side of the previous thread count's optimum to search")
+    parser.add_argument("--no-grid", action="store_true", help="skip measuring the grid points for comparison")
+    parser.add_argument("--output", type=str, default=OUTPUT_CSV)
+    parser.add_argument("--no-build", action="store_true", help="use the existing main binary")
+    args = parser.parse_args()
+
+    os.environ.update(orchestrate.PINNING)
+    if not args.no_build:
+        adaptive_sweep.build()
+
+    rows = []
+    for mtx_path in args.mtx:
+        for schedule in args.schedules:
+            print(f"Searching {mtx_path} ({schedule})...")
+            rows.extend(search(mtx_path, schedule, sorted(args.threads), args.max_chunk, args.max_evals,
+                               args.warm_span, not args.no_grid))
+
+    result = pd.DataFrame(rows)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    result.to_csv(args.output, index=False, float_format="%.6f")
+    with pd.option_context("display.width", 200, "display.max_rows", None):
+        print(result.to_string(index=False, float_format="{:.4f}".format))
+    print(f"Searched chunk sizes in {result['evaluations'].sum()} runs "
+          f"(the grid has {len(GRID_CHUNKS)} per configuration).")
+    print(f"Saved {len(result)} rows to {args.output}")
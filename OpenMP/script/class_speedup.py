@@ -1,64 +1,32 @@
+import argparse
 import pandas as pd
 import numpy as np
+import figures
 import matplotlib.pyplot as plt
 import os
-
-def compute_block_percentile90(group):
-    # Computes the 90th percentile of execution time in blocks of 10 measurements.
-    results = []
-    rows = group.shape[0]
-    for i in range(0, rows, 10):
-        block = group.iloc[i:i+10]
-        if len(block) == 10:
-            p90 = np.percentile(block["exec_time"], 90, method='lower')
-            
-            row_data = block.iloc[0][[
-                "matrix_name", "compiler_option", "thread_option",
-                "chunk_size_option", "scheduling_option"
-            ]].to_dict()
-            
-            row_data["p90_exec_time"] = p90
-            results.append(row_data)
-            
-    return pd.DataFrame(results)
-
-def preprocess_csv(df):
-    
-    df = df.replace({"Nan": np.nan, "NaN": np.nan})
-
-    integer_cols = [
-        "rows", "cols", "nz",
-        "thread_option", "chunk_size_option"
-    ]
-
-    print("Starting type conversion...")
-    for col in integer_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-        df[col] = df[col].astype('Int64')
-    print("Type conversion complete.")
-
-    df_sorted = df.sort_values([
-        "matrix_name", "compiler_option", "thread_option",
-        "chunk_size_option", "scheduling_option"
-    ])
-
-    df_90_perc = df_sorted.groupby([
-        "matrix_name", "compiler_option",
-        "thread_option", "chunk_size_option",
-        "scheduling_option"
-    ], dropna=False, group_keys=False).apply(compute_block_percentile90).reset_index(drop=True)
-
-    return df_90_perc
-
+import analysis
+import autotune
 
 csv_filepath = "results/final_results_time.csv" 
 plots_dir = "plots"
 
-MATRIX_CONFIGS = {
-    "bayer03.mtx": {"chunk_size": 1000, "label": "bayer03 (chunk: 1000)"},
-    "G3_circuit.mtx": {"chunk_size": 10000, "label": "G3_circuit (chunk: 10000)"},
-    "rajat31.mtx": {"chunk_size": 1000, "label": "rajat31 (chunk: 1000)"}
-}
+# one matrix per dimension class
+MATRICES = ["bayer03.mtx", "G3_circuit.mtx", "rajat31.mtx"]
+
+# chunk sizes of the figure in the report (the default, see --chunks for the
+# measured best or the autotuner's prediction)
+REPORT_CHUNK_SIZES = {"bayer03.mtx": 1000, "G3_circuit.mtx": 10000, "rajat31.mtx": 1000}
+
+def matrix_configs(results, source="report"):
+    configs = {}
+    chunk_sizes = autotune.chunk_sizes(results, MATRICES, source, REPORT_CHUNK_SIZES, csv_filepath)
+    for matrix_name in MATRICES:
+        chunk_size = chunk_sizes[matrix_name]
+        configs[matrix_name] = {
+            "chunk_size": chunk_size,
+            "label": f"{matrix_name.replace('.mtx', '')} (chunk: {chunk_size})"
+        }
+    return configs
 
 BASE_COLOR_G3 = "#4490c6"
 BASE_COLOR_B3 = "#e73d3d"
@@ -68,88 +36,53 @@ SCHEDULE_ORDER = ["static", "dynamic", "guided"]
 
 THEORETICAL_COLOR = "black"
 
-df_raw = pd.read_csv(csv_filepath)
-df_90_perc = preprocess_csv(df_raw)
+def build_payload(results, matrix_configs):
+    plot_data = {}
+    all_threads = []
+    all_max_speedups = {}
 
-os.makedirs(plots_dir, exist_ok=True)
-
-
-plot_data = {}
-all_threads = []
-all_max_speedups = {}
-
-for matrix_name, config in MATRIX_CONFIGS.items():
-    optimal_chunk_size = config["chunk_size"]
-    
-    matrix_chunk_data = df_90_perc[
-        (df_90_perc["matrix_name"] == matrix_name) &
-        (df_90_perc["chunk_size_option"].astype('Int64') == optimal_chunk_size)
-    ].copy()
+    for matrix_name, config in matrix_configs.items():
+        optimal_chunk_size = config["chunk_size"]
 
-    sequential_time_df = df_90_perc[
-        (df_90_perc["matrix_name"] == matrix_name) &
-        (df_90_perc["scheduling_option"].isna())
-    ]
-    
-    if sequential_time_df.empty:
-        continue
-    
-    sequential_time = sequential_time_df["p90_exec_time"].iloc[0]
+        sequential_time = results.sequential_baseline(matrix_name)
 
-    if pd.isna(sequential_time) or sequential_time <= 0:
-        continue
+        if pd.isna(sequential_time) or sequential_time <= 0:
+            continue
 
-    threads = sorted([int(t) for t in matrix_chunk_data["thread_option"].dropna().unique()])
-    all_threads.extend(threads)
-    
-    best_speedup = -1.0
-    best_schedule_type = None
-    best_schedule_speedups = {}
+        threads = results.threads(matrix_name, optimal_chunk_size)
+        all_threads.extend(threads)
     
-    all_schedule_speedups = {}
-    
-    for schedule_type in SCHEDULE_ORDER:
-        schedule_data = matrix_chunk_data[
-            matrix_chunk_data["scheduling_option"] == schedule_type
-        ].copy()
+        best_schedule_type, best_schedule_series = results.best_schedule(matrix_name, optimal_chunk_size, SCHEDULE_ORDER)
 
-        speedups = {}
-        for t in threads:
-            thread_schedule_time_df = schedule_data[schedule_data["thread_option"] == t]
-            
-            if not thread_schedule_time_df.empty:
-                parallel_time = thread_schedule_time_df["p90_exec_time"].iloc[0]
-                if pd.notna(parallel_time) and parallel_time > 0:
-                    speedup = sequential_time / parallel_time
-                    speedups[t] = speedup
-                    
-                    if speedup > best_speedup:
-                        best_speedup = speedup
-                        best_schedule_type = schedule_type
-                        
-                else:
-                    speedups[t] = np.nan
-            else:
-                speedups[t] = np.nan
-        
-        all_schedule_speedups[schedule_type] = speedups
-
-    if best_schedule_type:
-        best_schedule_speedups = all_schedule_speedups[best_schedule_type]
+        if best_schedule_type:
+            best_schedule_speedups = best_schedule_series.to_dict()
         
-        plot_data[matrix_name] = {
-            "label": f"{config['label']} ({best_schedule_type})",
-            "data": best_schedule_speedups,
-            "threads": threads,
-            "best_schedule": best_schedule_type
-        }
-        all_max_speedups[matrix_name] = best_speedup
+            plot_data[matrix_name] = {
+                "label": f"{config['label']} ({best_schedule_type})",
+                "data": best_schedule_speedups,
+                "threads": threads,
+                "best_schedule": best_schedule_type
+            }
+            all_max_speedups[matrix_name] = best_schedule_series.max()
+
+    final_threads = sorted([int(t) for t in list(set(all_threads))])
+
+    if not plot_data or not final_threads:
+        return None
+
+    return {
+        "plot_data": plot_data,
+        "all_max_speedups": all_max_speedups,
+        "final_threads": final_threads,
+        "title_matrix_names": " vs ".join([cfg['label'].split('(')[0].strip() for cfg in matrix_configs.values()]),
+        "filepath": os.path.join(plots_dir, "strong_scaling_best_schedule.png")
+    }
 
-final_threads = sorted([int(t) for t in list(set(all_threads))])
+def render_best_schedule(payload):
+    plot_data = payload["plot_data"]
+    all_max_speedups = payload["all_max_speedups"]
+    final_threads = payload["final_threads"]
 
-if not plot_data or not final_threads:
-    pass
-else:
     plt.figure(figsize=(12, 8))
 
     plt.rcParams.update({
@@ -251,17 +184,36 @@ else:
     plt.xlabel("Number of Threads")
     plt.ylabel("Speedup")
     
-    title_matrix_names = " vs ".join([cfg['label'].split('(')[0].strip() for cfg in MATRIX_CONFIGS.values()])
-    plt.title(f"Strong Scaling Comparison (Best Schedule): {title_matrix_names}", fontsize=14)
+    plt.title(f"Strong Scaling Comparison (Best Schedule): {payload['title_matrix_names']}", fontsize=14)
     
     plt.xticks(final_threads)
     plt.grid(True, linestyle='--', alpha=0.6)
     
     plt.tight_layout()
 
-    filename = "strong_scaling_best_schedule.png"
-    filepath = os.path.join(plots_dir, filename)
-    plt.savefig(filepath)
+    plt.savefig(payload["filepath"])
     plt.close()
-    
-print(f"Grafico salvato in: {filepath}")
\ No newline at end of file
+    return payload["filepath"]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Strong scaling of the best schedule for different dimension classes.")
+    parser.add_argument("--chunks", choices=autotune.CHUNK_SOURCES, default="report",
+                        help="chunk size of every matrix: the one of the report (default), the measured best one "
+                             "or the autotuner's prediction")
+    figures.add_render_arguments(parser)
+    args = parser.parse_args()
+
+    results = analysis.load(csv_filepath)
+    configs = matrix_configs(results, args.chunks)
+
+    os.makedirs(plots_dir, exist_ok=True)
+
+    payload = build_payload(results, configs)
+    payloads = [payload] if payload is not None else []
+
+    style = {
+        "matrix_configs": configs,
+        "colors": [BASE_COLOR_G3, BASE_COLOR_B3, BASE_COLOR_R31, THEORETICAL_COLOR]
+    }
+    for filepath in figures.render_all(render_best_schedule, payloads, 1, style, args.force):
+        print(f"Grafico salvato in: {filepath}")
@@ -0,0 +1,179 @@
+import os
+import sys
+import hashlib
+import argparse
+import pandas as pd
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
+# Typed schemas of the results files. Every column not listed here is read as float64.
+# "Nan" is how time_script.sh / cache_script.sh mark the options of a sequential run.
+SCHEMAS = {
+    "time": {
+        "category": ["matrix_name", "compiler_option", "scheduling_option"],
+        "Int64": ["rows", "cols", "nz", "thread_option", "chunk_size_option"],
+    },
+    "cache": {
+        "category": ["matrix_name", "compiler_option", "scheduling_option", "perf_start"],
+        "Int64": ["rows", "cols", "nz", "thread_option", "chunk_size_option",
+                  "L1_loads", "L1_misses", "LLC_loads", "LLC_misses"],
+    },
+    "scaling": {
+        "category": ["matrix_name"],
+        "Int64": ["rows", "procs", "max_vol", "min_vol", "max_load", "min_load"],
+    },
+    "counters": {
+        "category": ["matrix_name", "compiler_option", "scheduling_option", "perf_start", "event", "unit"],
+        "Int64": ["rows", "cols", "nz", "thread_option", "chunk_size_option"],
+    },
+    "reps": {
+        "category": ["matrix_name", "compiler_option", "scheduling_option"],
+        "Int64": ["rows", "cols", "nz", "thread_option", "chunk_size_option", "repetitions", "converged"],
+    },
+}
+
+NA_VALUES = ["Nan", "NaN", "nan"]
+
+CACHE_DIRNAME = ".cache"
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def detect_schema(columns):
+    columns = set(columns)
+    if "exec_time" in columns:
+        return "time"
+    if "LLC_misses" in columns:
+        return "cache"
+    if "procs" in columns:
+        return "scaling"
+    if "event" in columns:
+        return "counters"
+    if "repetitions" in columns:
+        return "reps"
+    raise ValueError(f"Unknown results layout: {sorted(columns)}")
+
+def sidecar_path(csv_path):
+    # results/final_results_time.csv -> results/.cache/final_results_time.feather
+    folder, name = os.path.split(csv_path)
+    return os.path.join(folder, CACHE_DIRNAME, os.path.splitext(name)[0] + ".feather")
+
+def read_csv_typed(csv_path):
+    header = pd.read_csv(csv_path, nrows=0).columns
+    schema = SCHEMAS[detect_schema(header)]
+
+    dtypes = {}
+    for col in header:
+        if col in schema["category"]:
+            dtypes[col] = "category"
+        elif col in schema["Int64"]:
+            dtypes[col] = "Int64"
+        else:
+            dtypes[col] = np.float64
+
+    try:
+        df = pd.read_csv(csv_path, na_values=NA_VALUES, dtype=dtypes)
+    except (ValueError, TypeError):
+        # perf can print "<not counted>" instead of a number: parse as text and coerce
+        df = pd.read_csv(csv_path, na_values=NA_VALUES, dtype=str)
+        for col, dtype in dtypes.items():
+            if dtype != "category":
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+
+    for col in schema["category"]:
+        if col in header:
+            categories = sorted(df[col].dropna().unique())
+            df[col] = df[col].astype(pd.CategoricalDtype(categories))
+
+    return df
+
+def _source_metadata(csv_path, digest=None):
+    stat_info = os.stat(csv_path)
+    return {
+        b"source_mtime": str(stat_info.st_mtime_ns).encode(),
+        b"source_size": str(stat_info.st_size).encode(),
+        b"source_sha256": (digest or file_digest(csv_path)).encode(),
+    }
+
+def _write_sidecar(csv_path, table, digest=None):
+    # table with the metadata of csv_path, written atomically to its sidecar
+    metadata = dict(table.schema.metadata or {})
+    metadata.update(_source_metadata(csv_path, digest))
+    table = table.replace_schema_metadata(metadata)
+
+    path = sidecar_path(csv_path)
+    tmp_path = path + ".tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+def convert(csv_path, digest=None):
+    # Parse csv_path once and store it as an uncompressed Feather (Arrow IPC)
+    # file, so later loads can memory-map it instead of re-parsing text.
+    df = read_csv_typed(csv_path)
+    if pa is None:
+        return df
+
+    os.makedirs(os.path.dirname(sidecar_path(csv_path)), exist_ok=True)
+    _write_sidecar(csv_path, pa.Table.from_pandas(df, preserve_index=False), digest)
+    return df
+
+def is_fresh(csv_path):
+    # Returns (fresh, digest). The digest is only computed when the csv mtime
+    # or size moved, and is handed back so convert() doesn't hash twice. When
+    # it still matches (csv touched or copied), the sidecar takes the new
+    # mtime and size, so the next call doesn't hash again.
+    path = sidecar_path(csv_path)
+    if pa is None or not os.path.exists(path):
+        return False, None
+
+    with pa.memory_map(path) as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+
+    stat_info = os.stat(csv_path)
+    if (metadata.get(b"source_mtime") == str(stat_info.st_mtime_ns).encode() and
+            metadata.get(b"source_size") == str(stat_info.st_size).encode()):
+        return True, None
+
+    digest = file_digest(csv_path)
+    if metadata.get(b"source_sha256") != digest.encode():
+        return False, digest
+    _write_sidecar(csv_path, feather.read_table(path, memory_map=False), digest)
+    return True, digest
+
+def load(csv_path):
+    # Typed results table for csv_path: memory-mapped from the Feather sidecar
+    # when it matches the csv, otherwise parsed from the csv (and re-cached).
+    fresh, digest = is_fresh(csv_path)
+    if not fresh:
+        return convert(csv_path, digest)
+
+    table = feather.read_table(sidecar_path(csv_path), memory_map=True)
+    return table.to_pandas()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert results csv files to typed Feather sidecars.")
+    parser.add_argument("csv", type=str, nargs="*",
+                        default=["results/final_results_time.csv", "results/final_results_cache.csv"])
+    parser.add_argument("--force", action="store_true", help="rewrite sidecars even if they are up to date")
+    args = parser.parse_args()
+
+    if pa is None:
+        print("pyarrow is not installed, nothing to convert.")
+        sys.exit(1)
+
+    for csv_path in args.csv:
+        fresh, digest = is_fresh(csv_path)
+        if fresh and not args.force:
+            print(f"{sidecar_path(csv_path)} is up to date.")
+            continue
+        df = convert(csv_path, digest)
+        print(f"Converted {csv_path} -> {sidecar_path(csv_path)} ({len(df)} rows)")
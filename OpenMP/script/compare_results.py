@@ -0,0 +1,121 @@
+import sys
+import json
+import argparse
+import numpy as np
+import pandas as pd
+import columnar
+import preprocess
+
+# configurations are aligned on these, so the compiler option (or anything
+# else that changed between the runs) may differ
+KEY_COLS = ["matrix_name", "thread_option", "chunk_size_option", "scheduling_option"]
+
+def samples(csv_path):
+    # exec_time samples of every configuration, in complete blocks only (as preprocess)
+    df = preprocess.convert_types(columnar.load(csv_path))
+    complete, _ = preprocess.split_complete_blocks(df)
+    complete = complete.astype({"matrix_name": str, "scheduling_option": str})
+    complete["scheduling_option"] = complete["scheduling_option"].replace("nan", np.nan)
+    grouped = complete.groupby(KEY_COLS, dropna=False, sort=False)["exec_time"]
+    return {key: group.to_numpy(np.float64) for key, group in grouped}
+
+def p90(values, axis=-1):
+    # np.percentile(..., 90, method='lower') along axis, as aggregate_blocks
+    n = values.shape[axis]
+    k = int(np.floor(0.9 * (n - 1)))
+    return np.partition(values, k, axis=axis).take(k, axis=axis)
+
+def bootstrap_ratio(baseline, candidate, confidence=0.95, resamples=2000, rng=None):
+    # point estimate and percentile bootstrap CI of p90(candidate) / p90(baseline),
+    # resampling the two runs independently
+    rng = np.random.default_rng() if rng is None else rng
+    base = p90(baseline[rng.integers(0, len(baseline), size=(resamples, len(baseline)))])
+    cand = p90(candidate[rng.integers(0, len(candidate), size=(resamples, len(candidate)))])
+    ratios = cand / base
+    alpha = (1 - confidence) / 2
+    return p90(candidate) / p90(baseline), np.quantile(ratios, alpha), np.quantile(ratios, 1 - alpha)
+
+def compare(baseline_csv, candidate_csv, confidence=0.95, min_effect=0.05, resamples=2000, seed=None):
+    # One entry per configuration present in both files. A regression is a
+    # configuration whose whole CI of the time ratio lies above 1 + min_effect
+    # (an improvement, below 1 - min_effect); anything else is unchanged.
+    rng = np.random.default_rng(seed)
+    baseline = samples(baseline_csv)
+    candidate = samples(candidate_csv)
+
+    entries = []
+    for key in baseline.keys() & candidate.keys():
+        ratio, low, high = bootstrap_ratio(baseline[key], candidate[key], confidence, resamples, rng)
+        if low > 1 + min_effect:
+            status = "regression"
+        elif high < 1 - min_effect:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        matrix_name, threads, chunk, schedule = key
+        entries.append({
+            "matrix_name": matrix_name,
+            "thread_option": None if pd.isna(threads) else int(threads),
+            "chunk_size_option": None if pd.isna(chunk) else int(chunk),
+            "scheduling_option": None if pd.isna(schedule) else schedule,
+            "baseline_p90": float(p90(baseline[key])),
+            "candidate_p90": float(p90(candidate[key])),
+            "ratio": float(ratio),
+            "ci_low": float(low),
+            "ci_high": float(high),
+            "status": status,
+        })
+
+    entries.sort(key=lambda e: -e["ratio"])
+    counts = {status: sum(e["status"] == status for e in entries) for status in ["regression", "improvement", "unchanged"]}
+    return {
+        "baseline": baseline_csv,
+        "candidate": candidate_csv,
+        "confidence": confidence,
+        "min_effect": min_effect,
+        "compared": len(entries),
+        "only_in_baseline": len(baseline.keys() - candidate.keys()),
+        "only_in_candidate": len(candidate.keys() - baseline.keys()),
+        **counts,
+        "configurations": entries,
+    }
+
+def describe(entry):
+    if entry["thread_option"] is None:
+        return f"{entry['matrix_name']} (sequential)"
+    return (f"{entry['matrix_name']} ({entry['thread_option']} threads, "
+            f"{entry['scheduling_option']}, chunk {entry['chunk_size_option']})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the p90 times of two result files configuration by "
+                                                 "configuration and fail if any significant regression is found.")
+    parser.add_argument("baseline", type=str)
+    parser.add_argument("candidate", type=str)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--min-effect", type=float, default=0.05,
+                        help="smallest relative change reported (default 0.05, i.e. 5%%)")
+    parser.add_argument("--resamples", type=int, default=2000)
+    parser.add_argument("--seed", type=int, help="seed of the bootstrap resampling")
+    parser.add_argument("--report", type=str, help="write the full report as json to this file")
+    parser.add_argument("--show", type=int, default=10, help="regressions and improvements printed (default 10 each)")
+    args = parser.parse_args()
+
+    report = compare(args.baseline, args.candidate, args.confidence, args.min_effect, args.resamples, args.seed)
+
+    print(f"Compared {report['compared']} configurations ({report['only_in_baseline']} only in the baseline, "
+          f"{report['only_in_candidate']} only in the candidate): {report['regression']} regressions, "
+          f"{report['improvement']} improvements, {report['unchanged']} unchanged "
+          f"at {args.confidence:.0%} confidence and {args.min_effect:.0%} minimum effect.")
+    for status, entries in [("Regressions", [e for e in report["configurations"] if e["status"] == "regression"]),
+                            ("Improvements", [e for e in reversed(report["configurations"]) if e["status"] == "improvement"])]:
+        if entries:
+            print(f"\n{status} (candidate / baseline p90 time):")
+            for entry in entries[:args.show]:
+                print(f"  {describe(entry)}: {entry['ratio']:.3f} [{entry['ci_low']:.3f}, {entry['ci_high']:.3f}]")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f"\nSaved report to {args.report}")
+
+    sys.exit(1 if report["regression"] else 0)
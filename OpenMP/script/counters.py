@@ -0,0 +1,119 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import analysis
+import columnar
+import metrics
+import orchestrate
+import preprocess
+
+KEY_COLS = ["matrix_name", "thread_option", "chunk_size_option", "scheduling_option"]
+DIM_COLS = ["rows", "cols", "nz"]
+JOINED_CSV = "results/final_results_joined.csv"
+
+LINE_BYTES = 64
+
+# events of the cache csv, stored under its column names
+EVENT_COLUMNS = dict(zip(orchestrate.PERF_EVENTS, ["L1_loads", "L1_misses", "LLC_loads", "LLC_misses"]))
+
+DERIVED = ["L1_miss_rate", "LLC_miss_rate", "L1_misses_per_nz", "LLC_misses_per_nz",
+           "dram_bytes", "dram_traffic_ratio"]
+
+def from_cache_csv(cache_csv=orchestrate.CACHE_CSV):
+    # the four counters of a cache csv in the long layout of the counters
+    # store (perf_start kept, no unit nor run percentage recorded)
+    df = columnar.load(cache_csv)
+    id_cols = KEY_COLS + DIM_COLS + ["compiler_option", "perf_start"]
+    long = df.melt(id_vars=id_cols, value_vars=list(EVENT_COLUMNS.values()), var_name="event", value_name="value")
+    long["event"] = long["event"].map({column: event for event, column in EVENT_COLUMNS.items()})
+    long["unit"] = np.nan
+    long["run_pct"] = np.nan
+    return long
+
+def load_counters(counters_csv=orchestrate.COUNTERS_CSV, cache_csv=orchestrate.CACHE_CSV):
+    if os.path.exists(counters_csv):
+        return columnar.load(counters_csv)
+    return from_cache_csv(cache_csv)
+
+def column_name(event):
+    return EVENT_COLUMNS.get(event, event.replace("-", "_").replace(":", "_").replace("/", "_"))
+
+def to_wide(counters):
+    # One row per configuration, a column per event and a <column>_run_pct
+    # one per event. Repeated measurements of a configuration are averaged.
+    counters = counters.astype({col: str for col in ["matrix_name", "scheduling_option", "event"]})
+    counters["scheduling_option"] = counters["scheduling_option"].replace("nan", np.nan)
+    counters["column"] = counters["event"].map(column_name)
+
+    index = KEY_COLS + DIM_COLS
+    grouped = counters.groupby(index + ["column"], dropna=False, sort=False)
+    values = grouped["value"].mean().unstack("column")
+    run_pct = grouped["run_pct"].mean().unstack("column").add_suffix("_run_pct")
+    return pd.concat([values, run_pct], axis=1).reset_index()
+
+def time_table(results):
+    # p90 of the first block of every configuration (as analysis.Results
+    # does), with the speedup over the sequential run of the matrix
+    table = results.table.astype({"matrix_name": str, "scheduling_option": str})
+    table["scheduling_option"] = table["scheduling_option"].replace("nan", np.nan)
+    table = table.drop_duplicates(KEY_COLS)[KEY_COLS + [results.time_col]]
+    sequential = results.sequential.copy()
+    sequential.index = sequential.index.astype(str)
+    table["speedup"] = table["matrix_name"].map(sequential).astype(np.float64) / table[results.time_col]
+    return table
+
+def join(wide, results):
+    # counters and p90 times aligned on (matrix, threads, chunk, schedule);
+    # the sequential runs match on their missing options
+    for col in ["thread_option", "chunk_size_option"]:
+        wide[col] = wide[col].astype("Int64")
+    return wide.merge(time_table(results), on=KEY_COLS, how="left")
+
+def derive(df):
+    # vectorized metrics of every configuration. The counters cover the
+    # whole run of main in C-N mode (matrix reading included, one SpMV)
+    df = df.copy()
+    nz = df["nz"].astype(np.float64)
+    df["L1_miss_rate"] = df["L1_misses"] / df["L1_loads"].where(df["L1_loads"] > 0)
+    df["LLC_miss_rate"] = df["LLC_misses"] / df["LLC_loads"].where(df["LLC_loads"] > 0)
+    df["L1_misses_per_nz"] = df["L1_misses"] / nz
+    df["LLC_misses_per_nz"] = df["LLC_misses"] / nz
+    df["dram_bytes"] = df["LLC_misses"] * LINE_BYTES
+    df["dram_traffic_ratio"] = df["dram_bytes"] / metrics.spmv_bytes(
+        df["rows"].astype(np.float64), df["cols"].astype(np.float64), nz)
+    return df
+
+def correlations(df, columns=DERIVED, method="spearman"):
+    # correlation of every metric with the speedup, per matrix, over its
+    # parallel configurations
+    parallel = df[df["thread_option"].notna() & df["speedup"].notna()]
+    rows = {}
+    for matrix_name, data in parallel.groupby("matrix_name", sort=False):
+        rows[matrix_name] = data[columns].corrwith(data["speedup"], method=method)
+    rows["all"] = parallel[columns].corrwith(parallel["speedup"], method=method)
+    return pd.DataFrame(rows).T
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Join hardware counters with p90 times per configuration and derive "
+                                                 "miss rates, misses per nonzero, DRAM traffic and their correlation "
+                                                 "with the speedup.")
+    parser.add_argument("--counters", type=str, default=orchestrate.COUNTERS_CSV,
+                        help="counters store written by orchestrate.py (falls back to --cache)")
+    parser.add_argument("--cache", type=str, default=orchestrate.CACHE_CSV)
+    parser.add_argument("--csv", type=str, default=analysis.TIME_CSV)
+    parser.add_argument("--stat", choices=preprocess.STATISTICS, default="p90")
+    parser.add_argument("--method", choices=["pearson", "spearman", "kendall"], default="spearman")
+    parser.add_argument("--output", type=str, default=JOINED_CSV)
+    args = parser.parse_args()
+
+    wide = to_wide(load_counters(args.counters, args.cache))
+    joined = derive(join(wide, analysis.load(args.csv, args.stat)))
+
+    joined.to_csv(args.output, index=False, na_rep="Nan", float_format="%.6f")
+    print(f"Saved {len(joined)} configurations to {args.output} "
+          f"({joined[f'{args.stat}_exec_time'].isna().sum()} without a time)")
+
+    with pd.option_context("display.width", 200, "display.float_format", "{:.3f}".format):
+        print(f"\n{args.method.capitalize()} correlation with the speedup:")
+        print(correlations(joined, method=args.method))
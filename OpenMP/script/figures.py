@@ -0,0 +1,81 @@
+import os
+import json
+import hashlib
+import inspect
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+
+# figures are only saved to disk, never shown: Agg is safe in worker processes
+matplotlib.use("Agg")
+
+MANIFEST_PATH = "plots/.manifest.json"
+
+def add_render_arguments(parser):
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="number of processes rendering figures in parallel (default: all cores)")
+    parser.add_argument("--force", action="store_true",
+                        help="redraw every figure, even those whose data did not change")
+
+def figure_digest(render, payload, style=None):
+    # Content address of a figure: the exact data slice it plots, the style
+    # constants and the source of the function drawing it, plus the matplotlib
+    # version, since any of them changes the resulting image.
+    content = json.dumps({
+        "payload": payload,
+        "style": style,
+        "render": inspect.getsource(render),
+        "matplotlib": matplotlib.__version__
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+def load_manifest(manifest_path=MANIFEST_PATH):
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(manifest, manifest_path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def render_all(render, payloads, jobs=1, style=None, force=False, manifest_path=MANIFEST_PATH):
+    # Each payload holds the already sliced data and the output path
+    # ("filepath") of one figure, so workers never touch the full results
+    # table. Figures whose digest matches the manifest and whose file still
+    # exists are skipped. Returns the paths rendered, in payload order.
+    manifest = load_manifest(manifest_path)
+
+    pending = []
+    digests = []
+    for payload in payloads:
+        digest = figure_digest(render, payload, style)
+        filepath = payload["filepath"]
+        if not force and manifest.get(filepath) == digest and os.path.exists(filepath):
+            continue
+        pending.append(payload)
+        digests.append(digest)
+
+    skipped = len(payloads) - len(pending)
+    if skipped:
+        print(f"{skipped} figure(s) up to date, skipped.")
+
+    if jobs <= 1 or len(pending) <= 1:
+        rendered = [render(payload) for payload in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as pool:
+            rendered = list(pool.map(render, pending))
+
+    if pending:
+        # re-read so that scripts run one after the other keep each other's entries
+        manifest = load_manifest(manifest_path)
+        for payload, digest in zip(pending, digests):
+            manifest[payload["filepath"]] = digest
+        save_manifest(manifest, manifest_path)
+
+    return rendered
@@ -0,0 +1,184 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import figures
+import matplotlib.pyplot as plt
+import analysis
+import columnar
+import preprocess
+
+plots_dir = "plots/roofline"
+
+VALUE_BYTES = 8   # double
+INDEX_BYTES = 4   # int
+
+# CSR SpMV y = A x streams, counted once each (compulsory traffic, i.e. the
+# lower bound reached when x stays in cache after its first use)
+STREAMS = ["values", "col_idx", "row_ptr", "x", "y"]
+
+def traffic(rows, cols, nz):
+    return {
+        "values": nz * VALUE_BYTES,
+        "col_idx": nz * INDEX_BYTES,
+        "row_ptr": (rows + 1) * INDEX_BYTES,
+        "x": cols * VALUE_BYTES,
+        "y": rows * VALUE_BYTES,
+    }
+
+def spmv_bytes(rows, cols, nz):
+    return sum(traffic(rows, cols, nz).values())
+
+def spmv_flops(nz):
+    # one multiply and one add per nonzero
+    return 2 * nz
+
+def measure_peak_bandwidth(n_bytes=256 * 1024 * 1024, repeats=5):
+    # STREAM "add" kernel (c = a + b, 3 arrays moved) on arrays much larger
+    # than the LLC, best of `repeats`. numpy runs it on a single core, so on
+    # a multi-core node this is a lower bound of the socket bandwidth: pass
+    # the STREAM figure of the machine with --peak-bw when known.
+    n = n_bytes // (3 * 8)
+    a = np.ones(n)
+    b = np.ones(n)
+    c = np.empty(n)
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        np.add(a, b, out=c)
+        best = min(best, time.perf_counter() - start)
+    return 3 * 8 * n / best / 1e9
+
+def annotate(df, time_col, peak_bw=None, peak_gflops=None):
+    # Adds flops, bytes, arithmetic intensity, GFLOP/s, GB/s and the percent
+    # of the peaks to every row; df needs rows, cols, nz and a time in ms.
+    df = df.copy()
+    rows, cols, nz = (df[col].astype(np.float64) for col in ("rows", "cols", "nz"))
+    seconds = df[time_col].astype(np.float64) / 1e3
+
+    df["flops"] = spmv_flops(nz)
+    df["bytes"] = spmv_bytes(rows, cols, nz)
+    df["intensity"] = df["flops"] / df["bytes"]
+    df["gflops"] = df["flops"] / seconds / 1e9
+    df["gbs"] = df["bytes"] / seconds / 1e9
+    if peak_bw:
+        df["pct_peak_bw"] = 100 * df["gbs"] / peak_bw
+    if peak_gflops:
+        df["pct_peak_gflops"] = 100 * df["gflops"] / peak_gflops
+    return df
+
+def matrix_dims(csv_path):
+    raw = columnar.load(csv_path)
+    dims = raw.drop_duplicates("matrix_name")[["matrix_name", "rows", "cols", "nz"]]
+    return dims.astype({"matrix_name": str})
+
+def time_metrics(csv_path, stat="p90", peak_bw=None, peak_gflops=None):
+    # aggregated OpenMP table (one row per block) with its metrics
+    table = analysis.load(csv_path, stat).table.astype({"matrix_name": str})
+    table = table.merge(matrix_dims(csv_path), on="matrix_name", how="left")
+    return annotate(table, f"{stat}_exec_time", peak_bw, peak_gflops)
+
+def scaling_metrics(csv_path, peak_bw=None, peak_gflops=None):
+    # MPI strong/weak scaling table: the total nz is avg_load * procs, the
+    # matrices are square and the time is the SpMV of the critical rank
+    df = pd.read_csv(csv_path)
+    df["cols"] = df["rows"]
+    df["nz"] = (df["avg_load"] * df["procs"]).round().astype(np.int64)
+    return annotate(df, "computation_time", peak_bw, peak_gflops)
+
+def build_payloads(metrics, peak_bw, peak_gflops):
+    payloads = []
+    parallel = metrics[metrics["thread_option"].notna()]
+    for matrix_name, data in parallel.groupby("matrix_name", sort=False):
+        # best configuration (schedule, chunk) for every thread count
+        best = data.loc[data.groupby("thread_option")["gflops"].idxmax()].sort_values("thread_option")
+        sequential = metrics[(metrics["matrix_name"] == matrix_name) & metrics["thread_option"].isna()]
+        payloads.append({
+            "matrix_name": matrix_name,
+            "intensity": float(data["intensity"].iloc[0]),
+            "threads": [int(t) for t in best["thread_option"]],
+            "gflops": best["gflops"].tolist(),
+            "labels": [f"{s}, chunk {int(c)}" for s, c in zip(best["scheduling_option"], best["chunk_size_option"])],
+            "sequential_gflops": sequential["gflops"].tolist(),
+            "best_gbs": float(data["gbs"].max()),
+            "peak_bw": peak_bw,
+            "peak_gflops": peak_gflops,
+            "filepath": os.path.join(plots_dir, f"{matrix_name}_roofline.png")
+        })
+    return payloads
+
+def render_roofline(payload):
+    intensity = payload["intensity"]
+    peak_bw = payload["peak_bw"]
+    peak_gflops = payload["peak_gflops"]
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+
+    # without a given peak the roof is the best bandwidth observed for the matrix
+    label = "Memory roof" if peak_bw else "Best observed bandwidth"
+    peak_bw = peak_bw or payload["best_gbs"]
+
+    x = np.logspace(np.log10(intensity) - 1.5, np.log10(intensity) + 1.5, 200)
+    roof = peak_bw * x
+    if peak_gflops:
+        roof = np.minimum(roof, peak_gflops)
+        ax.axhline(peak_gflops, color="gray", linestyle=":", linewidth=1)
+    ax.plot(x, roof, color="black", label=f"{label} ({peak_bw:.1f} GB/s)")
+    ax.axvline(intensity, color="gray", linestyle="--", linewidth=0.8)
+
+    colors = plt.cm.viridis(np.linspace(0, 1, len(payload["threads"])))
+    for threads, gflops, config, color in zip(payload["threads"], payload["gflops"], payload["labels"], colors):
+        ax.scatter(intensity, gflops, color=color, edgecolor="black", zorder=5, label=f"{threads} threads ({config})")
+    for gflops in payload["sequential_gflops"]:
+        ax.scatter(intensity, gflops, marker="s", color="red", edgecolor="black", zorder=5, label="Sequential")
+
+    ax.set_xscale("log")
+    ax.set_yscale("log")
+    ax.set_xlabel("Arithmetic intensity [FLOP/byte]")
+    ax.set_ylabel("Performance [GFLOP/s]")
+    ax.set_title(f"Roofline for Matrix: {payload['matrix_name']} (I = {intensity:.3f})")
+    ax.grid(True, which="both", linestyle="--", alpha=0.4)
+    ax.legend(fontsize=8, loc="upper left")
+
+    plt.tight_layout()
+    plt.savefig(payload["filepath"])
+    plt.close(fig)
+    return payload["filepath"]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GFLOP/s, effective GB/s and percent of peak of every aggregated "
+                                                 "configuration, with a roofline plot per matrix.")
+    parser.add_argument("--csv", type=str, default=analysis.TIME_CSV)
+    parser.add_argument("--scaling", type=str, nargs="*", default=[],
+                        help="MPI results (e.g. ../MPI/result/strong_scaling.csv) to annotate as well")
+    parser.add_argument("--stat", choices=preprocess.STATISTICS, default="p90")
+    parser.add_argument("--peak-bw", type=float, help="memory bandwidth peak in GB/s of the machine that ran the sweep")
+    parser.add_argument("--measure-peak", action="store_true",
+                        help="use the bandwidth measured on this machine as peak (only meaningful where the sweep ran)")
+    parser.add_argument("--peak-gflops", type=float, help="floating point peak in GFLOP/s (optional compute roof)")
+    parser.add_argument("--no-plots", action="store_true", help="only write the metrics csv files")
+    figures.add_render_arguments(parser)
+    args = parser.parse_args()
+
+    peak_bw = args.peak_bw
+    if peak_bw is None and args.measure_peak:
+        peak_bw = measure_peak_bandwidth()
+        print(f"Measured peak bandwidth: {peak_bw:.2f} GB/s (single core, use --peak-bw for the node figure)")
+
+    metrics = time_metrics(args.csv, args.stat, peak_bw, args.peak_gflops)
+    output = os.path.splitext(args.csv)[0] + "_metrics.csv"
+    metrics.to_csv(output, index=False, na_rep="Nan", float_format="%.6f")
+    print(f"Saved {len(metrics)} rows to {output}")
+
+    for csv_path in args.scaling:
+        scaling = scaling_metrics(csv_path, peak_bw, args.peak_gflops)
+        output = os.path.splitext(csv_path)[0] + "_metrics.csv"
+        scaling.to_csv(output, index=False, float_format="%.6f")
+        print(f"Saved {len(scaling)} rows to {output}")
+
+    if not args.no_plots:
+        os.makedirs(plots_dir, exist_ok=True)
+        payloads = build_payloads(metrics, peak_bw, args.peak_gflops)
+        for filepath in figures.render_all(render_roofline, payloads, args.jobs, force=args.force):
+            print(f"Saved plot to: {filepath}")
@@ -0,0 +1,66 @@
+import heapq
+import numpy as np
+
+SCHEDULES = ["static", "dynamic", "guided"]
+
+def chunk_bounds(n_rows, schedule, chunk, threads):
+    # [start, end) rows of every chunk, in the order libgomp hands them out
+    # for schedule(runtime) with omp_set_schedule(schedule, chunk)
+    chunk = max(1, int(chunk))
+    if schedule in ("static", "dynamic"):
+        starts = np.arange(0, n_rows, chunk, dtype=np.int64)
+        return np.stack([starts, np.minimum(starts + chunk, n_rows)], axis=1)
+    if schedule != "guided":
+        raise ValueError(f"Unknown schedule '{schedule}'. Use one of {SCHEDULES}.")
+
+    # guided: every chunk is the remaining rows over the threads, never
+    # below chunk (iter_ull_guided_next in libgomp)
+    bounds = []
+    start = 0
+    while start < n_rows:
+        remaining = n_rows - start
+        size = max(chunk, (remaining + threads - 1) // threads)
+        end = min(start + size, n_rows)
+        bounds.append((start, end))
+        start = end
+    return np.array(bounds, dtype=np.int64).reshape(-1, 2)
+
+def assign(row_cost, schedule, chunk, threads, dispatch_cost=0.0):
+    # Thread and [start, finish) time of every chunk, for rows costing
+    # row_cost each. static is round robin (no dispatch cost); dynamic and
+    # guided give the next chunk to the first thread to be free, paying
+    # dispatch_cost per chunk taken. Returns (bounds, owner, start, finish).
+    row_cost = np.asarray(row_cost, dtype=np.float64)
+    bounds = chunk_bounds(len(row_cost), schedule, chunk, threads)
+    prefix = np.concatenate([[0.0], np.cumsum(row_cost)])
+    cost = prefix[bounds[:, 1]] - prefix[bounds[:, 0]]
+    n_chunks = len(bounds)
+
+    if schedule == "static":
+        owner = np.arange(n_chunks, dtype=np.int64) % threads
+        finish = np.empty(n_chunks)
+        for t in range(threads):
+            finish[t::threads] = np.cumsum(cost[t::threads])
+        return bounds, owner, finish - cost, finish
+
+    cost = cost + dispatch_cost
+    owner = np.empty(n_chunks, dtype=np.int64)
+    start = np.empty(n_chunks)
+    free = [(0.0, t) for t in range(threads)]
+    for i in range(n_chunks):
+        # ties go to the lowest thread id
+        time, t = heapq.heappop(free)
+        owner[i] = t
+        start[i] = time
+        heapq.heappush(free, (time + cost[i], t))
+    return bounds, owner, start, start + cost
+
+def thread_rows(bounds, owner, threads):
+    # rows every thread computes, in execution order
+    rows = []
+    for t in range(threads):
+        mine = bounds[owner == t]
+        lengths = mine[:, 1] - mine[:, 0]
+        offsets = np.repeat(mine[:, 0] - (np.cumsum(lengths) - lengths), lengths)
+        rows.append(np.arange(lengths.sum(), dtype=np.int64) + offsets)
+    return rows
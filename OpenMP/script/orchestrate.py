@@ -0,0 +1,294 @@
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+import subprocess
+import catalog
+
+# Standard library only: this script runs on the cluster, where pandas is
+# not available (the adaptive mode, --target, needs numpy for repetitions.py).
+
+DATA_DIR = "data"
+SWEEP_DIR = "results/sweep"
+TIME_CSV = "results/final_results_time.csv"
+CACHE_CSV = "results/final_results_cache.csv"
+COUNTERS_CSV = "results/final_results_counters.csv"
+
+THREAD_OPTIONS = [1, 2, 4, 8, 16, 32, 64]
+CHUNK_SIZE_OPTIONS = [1, 10, 100, 1000, 10000]
+SCHEDULING_OPTIONS = ["static", "dynamic", "guided"]
+MODES = ["time", "cache"]
+
+SRC_FILES = ["src/main.c", "src/csr.c", "src/print.c", "src/mmio.c"]
+SEQUENTIAL_BINARY = "./main_seq"
+PARALLEL_BINARY = "./main"
+COMPILER_OPTION = "-O3"
+
+# thread pinning time_script.sh exports for the time runs
+PINNING = {"OMP_PROC_BIND": "close", "OMP_PLACES": "cores", "OMP_WAIT_POLICY": "active"}
+
+# the four counters of the cache csv, always measured first (--events adds more)
+PERF_EVENTS = ["L1-dcache-loads", "L1-dcache-load-misses", "LLC-loads", "LLC-misses"]
+
+# same headers time_script.sh and cache_script.sh write
+HEADERS = {
+    "time": ["matrix_name", "rows", "cols", "nz", "compiler_option", "thread_option",
+             "chunk_size_option", "scheduling_option", "exec_time"],
+    "cache": ["matrix_name", "rows", "cols", "nz", "compiler_option", "thread_option",
+              "chunk_size_option", "scheduling_option", "perf_start", "L1_loads", "L1_misses",
+              "LLC_loads", "LLC_misses"],
+}
+REPS_HEADER = ["matrix_name", "rows", "cols", "nz", "compiler_option", "thread_option",
+               "chunk_size_option", "scheduling_option", "repetitions", "p90_exec_time",
+               "ci_low", "ci_high", "converged"]
+# every event perf reported, one row each, with the percentage of the enabled
+# time the counter was actually running (below 100 when events are multiplexed)
+COUNTERS_HEADER = ["matrix_name", "rows", "cols", "nz", "compiler_option", "thread_option",
+                   "chunk_size_option", "scheduling_option", "perf_start", "event", "value",
+                   "unit", "run_pct"]
+
+def jobs_path(sweep_dir):
+    return os.path.join(sweep_dir, "jobs.json")
+
+def result_path(sweep_dir, job, suffix=".csv"):
+    return os.path.join(sweep_dir, job["mode"], job["id"] + suffix)
+
+def expand(matrices, modes, threads, chunks, schedules):
+    # Job list in the order of the bash scripts: for every mode the sequential
+    # run of every matrix, then the parallel grid.
+    jobs = []
+    for mode in modes:
+        for mtx_path in matrices:
+            stem = os.path.splitext(os.path.basename(mtx_path))[0]
+            jobs.append({"id": f"{stem}_seq", "mode": mode, "mtx": mtx_path,
+                         "threads": None, "schedule": None, "chunk": None})
+        for mtx_path in matrices:
+            stem = os.path.splitext(os.path.basename(mtx_path))[0]
+            for t in threads:
+                for chunk in chunks:
+                    for schedule in schedules:
+                        jobs.append({"id": f"{stem}_{t}_{schedule}_{chunk}", "mode": mode, "mtx": mtx_path,
+                                     "threads": t, "schedule": schedule, "chunk": chunk})
+    return jobs
+
+def write_atomic(path, header, rows):
+    # the result of a configuration appears whole or not at all
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def plan(sweep_dir, matrices, modes, threads, chunks, schedules, events=()):
+    jobs = expand(matrices, modes, threads, chunks, schedules)
+    os.makedirs(sweep_dir, exist_ok=True)
+    events = PERF_EVENTS + [e for e in events if e not in PERF_EVENTS]
+    grid = {"matrices": {m: catalog.dims(m) for m in matrices}, "events": events, "jobs": jobs}
+    tmp_path = jobs_path(sweep_dir) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(grid, f, indent=1)
+    os.replace(tmp_path, jobs_path(sweep_dir))
+    return grid
+
+def load_plan(sweep_dir):
+    with open(jobs_path(sweep_dir)) as f:
+        return json.load(f)
+
+def build():
+    # same compile lines as time_script.sh, one binary per mode
+    subprocess.run(["gcc", "-g", "-Iinclude", COMPILER_OPTION, *SRC_FILES, "-o", SEQUENTIAL_BINARY], check=True)
+    subprocess.run(["gcc", "-fopenmp", "-g", COMPILER_OPTION, "-Iinclude", *SRC_FILES, "-o", PARALLEL_BINARY], check=True)
+
+def command(job, perf_start):
+    if job["threads"] is None:
+        return [SEQUENTIAL_BINARY, perf_start, job["mtx"]]
+    return [PARALLEL_BINARY, perf_start, job["mtx"], str(job["threads"]), job["schedule"], str(job["chunk"])]
+
+def options(job):
+    # "Nan" for the options of a sequential run
+    return [job["threads"] if job["threads"] is not None else "Nan",
+            job["chunk"] if job["chunk"] is not None else "Nan",
+            job["schedule"] or "Nan"]
+
+def parse_perf_stat(text):
+    # Lines of "perf stat -x ," (counter value, unit, event, run time,
+    # percentage running, ...) as (event, value, unit, run_pct) strings.
+    # The value is kept as printed, e.g. "<not counted>" or "<not supported>".
+    counters = []
+    for line in text.splitlines():
+        fields = line.split(",")
+        if len(fields) < 3 or line.startswith("#") or not fields[2]:
+            continue
+        run_pct = fields[4] if len(fields) > 4 else ""
+        counters.append((fields[2], fields[0], fields[1], run_pct))
+    return counters
+
+def run_time(job, key, adaptive=None, pinning=True):
+    env = dict(os.environ, **PINNING) if pinning else None
+    if adaptive is not None:
+        import repetitions
+        times, summary = repetitions.measure(job["mtx"], job["threads"], job["schedule"], job["chunk"],
+                                             env=env, **adaptive)
+        reps = [key + [summary["repetitions"], f"{summary['p90_exec_time']:.6f}",
+                       f"{summary['ci_low']:.6f}", f"{summary['ci_high']:.6f}", summary["converged"]]]
+        return [key + [f"{x:.6f}"] for x in times], {".reps.csv": (REPS_HEADER, reps)}
+
+    output = subprocess.run(command(job, "W"), check=True, capture_output=True, text=True, env=env).stdout
+    return [key + [line] for line in output.split()], {}
+
+def run_cache(job, key, events=PERF_EVENTS):
+    # the row of cache_script.sh (the four PERF_EVENTS counters) plus every
+    # event measured, with units and run percentages, in a .perf.csv file
+    result = subprocess.run(["perf", "stat", "-x", ",", "-e", ",".join(events), *command(job, "C-N")],
+                            check=True, capture_output=True, text=True)
+    counters = parse_perf_stat(result.stderr)
+    values = {event: value for event, value, _, _ in counters}
+    row = key + ["C-N"] + [values.get(event, "") for event in PERF_EVENTS]
+    return [row], {".perf.csv": (COUNTERS_HEADER, [key + ["C-N", *counter] for counter in counters])}
+
+def shard_jobs(jobs, shard, shards):
+    return [job for i, job in enumerate(jobs) if i % shards == shard]
+
+def run(sweep_dir, shard=0, shards=1, budget=None, adaptive=None, pinning=True):
+    # Runs the jobs of this shard whose result file does not exist yet. With a
+    # budget (seconds) no job is started once the elapsed time plus the
+    # longest job seen so far would exceed it, so a walltime kill never
+    # interrupts a configuration half way.
+    grid = load_plan(sweep_dir)
+    jobs = shard_jobs(grid["jobs"], shard, shards)
+    pending = [job for job in jobs if not os.path.exists(result_path(sweep_dir, job))]
+    print(f"Shard {shard}/{shards}: {len(jobs) - len(pending)} of {len(jobs)} configurations already done.")
+
+    start = time.perf_counter()
+    longest = 0.0
+    for done, job in enumerate(pending):
+        elapsed = time.perf_counter() - start
+        if budget is not None and elapsed + longest > budget:
+            print(f"Budget of {budget:.0f} s reached, {len(pending) - done} configurations left for the next run.")
+            return False
+
+        job_start = time.perf_counter()
+        rows, cols, nz = grid["matrices"][job["mtx"]]
+        key = [os.path.basename(job["mtx"]), rows, cols, nz, COMPILER_OPTION] + options(job)
+        if job["mode"] == "time":
+            results, extras = run_time(job, key, adaptive, pinning)
+        else:
+            results, extras = run_cache(job, key, grid.get("events", PERF_EVENTS))
+
+        # the side files first: the main one marks the configuration as done
+        for suffix, (header, rows) in extras.items():
+            write_atomic(result_path(sweep_dir, job, suffix), header, rows)
+        write_atomic(result_path(sweep_dir, job), HEADERS[job["mode"]], results)
+        longest = max(longest, time.perf_counter() - job_start)
+        print(f"[{done + 1}/{len(pending)}] {job['mode']} {job['id']} ({time.perf_counter() - job_start:.1f} s)")
+    return True
+
+def status(sweep_dir):
+    grid = load_plan(sweep_dir)
+    counts = {}
+    for job in grid["jobs"]:
+        done, total = counts.get(job["mode"], (0, 0))
+        counts[job["mode"]] = (done + os.path.exists(result_path(sweep_dir, job)), total + 1)
+    for mode, (done, total) in counts.items():
+        print(f"{mode:>6}: {done}/{total} configurations done")
+    return all(done == total for done, total in counts.values())
+
+def collect(sweep_dir, outputs, counters_output=COUNTERS_CSV):
+    # Concatenates the per-configuration files, in job order, into the final
+    # csv of every mode (written atomically). Missing configurations are
+    # reported and skipped.
+    grid = load_plan(sweep_dir)
+    for mode, output in outputs.items():
+        jobs = [job for job in grid["jobs"] if job["mode"] == mode]
+        if not jobs:
+            continue
+        files = [(result_path(sweep_dir, job), HEADERS[mode]) for job in jobs]
+        if mode == "time":
+            reps = [(result_path(sweep_dir, job, ".reps.csv"), REPS_HEADER) for job in jobs]
+            if any(os.path.exists(path) for path, _ in reps):
+                concatenate(reps, os.path.splitext(output)[0] + "_reps.csv", REPS_HEADER)
+        else:
+            counters = [(result_path(sweep_dir, job, ".perf.csv"), COUNTERS_HEADER) for job in jobs]
+            if any(os.path.exists(path) for path, _ in counters):
+                concatenate(counters, counters_output, COUNTERS_HEADER)
+        missing = concatenate(files, output, HEADERS[mode])
+        print(f"Collected {len(jobs) - missing} of {len(jobs)} {mode} configurations into {output}")
+
+def concatenate(files, output, header):
+    rows = []
+    missing = 0
+    for path, _ in files:
+        if not os.path.exists(path):
+            missing += 1
+            continue
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            next(reader)
+            rows.extend(reader)
+    write_atomic(os.path.abspath(output), header, rows)
+    return missing
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumable time/cache sweep: the grid is expanded once into a job list, "
+                                                 "every configuration is stored in its own file as soon as it completes "
+                                                 "and reruns skip the configurations already done.")
+    parser.add_argument("--sweep-dir", type=str, default=SWEEP_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = commands.add_parser("plan", help="expand the grid into the job list and compile the binaries")
+    plan_parser.add_argument("mtx", type=str, nargs="*", help="matrices to sweep (default: every .mtx in data/)")
+    plan_parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    plan_parser.add_argument("--threads", type=int, nargs="+", default=THREAD_OPTIONS)
+    plan_parser.add_argument("--chunks", type=int, nargs="+", default=CHUNK_SIZE_OPTIONS)
+    plan_parser.add_argument("--schedules", nargs="+", choices=SCHEDULING_OPTIONS, default=SCHEDULING_OPTIONS)
+    plan_parser.add_argument("--events", nargs="+", default=[],
+                             help="perf events measured in cache mode on top of the four of the cache csv")
+    plan_parser.add_argument("--no-build", action="store_true")
+
+    run_parser = commands.add_parser("run", help="run the pending configurations of a shard")
+    run_parser.add_argument("--shard", type=int, default=int(os.environ.get("PBS_ARRAY_INDEX", 0)),
+                            help="index of this shard (default: $PBS_ARRAY_INDEX or 0)")
+    run_parser.add_argument("--shards", type=int, default=1, help="number of shards the job list is split into")
+    run_parser.add_argument("--budget", type=float, help="seconds available, e.g. the walltime minus a margin")
+    run_parser.add_argument("--target", type=float,
+                            help="adaptive repetitions (see repetitions.py) until the p90 CI is this narrow")
+    run_parser.add_argument("--max-blocks", type=int, default=10)
+    run_parser.add_argument("--no-pinning", action="store_true",
+                            help="time runs without the OMP_PROC_BIND/OMP_PLACES/OMP_WAIT_POLICY exports")
+    run_parser.add_argument("--collect", action="store_true", help="collect the results when everything is done")
+
+    commands.add_parser("status", help="count the configurations done per mode")
+
+    collect_parser = commands.add_parser("collect", help="merge the per-configuration files into the final csv files")
+    collect_parser.add_argument("--time-output", type=str, default=TIME_CSV)
+    collect_parser.add_argument("--cache-output", type=str, default=CACHE_CSV)
+    collect_parser.add_argument("--counters-output", type=str, default=COUNTERS_CSV)
+
+    args = parser.parse_args()
+
+    if args.command == "plan":
+        matrices = args.mtx or sorted(os.path.join(DATA_DIR, f) for f in os.listdir(DATA_DIR) if f.endswith(".mtx"))
+        grid = plan(args.sweep_dir, matrices, args.modes, args.threads, args.chunks, args.schedules, args.events)
+        if not args.no_build:
+            build()
+        print(f"Planned {len(grid['jobs'])} configurations in {jobs_path(args.sweep_dir)}")
+    elif args.command == "run":
+        if not 0 <= args.shard < args.shards:
+            parser.error(f"--shard must be in [0, {args.shards})")
+        adaptive = None
+        if args.target is not None:
+            adaptive = {"target": args.target, "max_blocks": args.max_blocks}
+        finished = run(args.sweep_dir, args.shard, args.shards, args.budget, adaptive, not args.no_pinning)
+        if args.collect and finished and status(args.sweep_dir):
+            collect(args.sweep_dir, {"time": TIME_CSV, "cache": CACHE_CSV})
+        sys.exit(0 if finished else 3)
+    elif args.command == "status":
+        sys.exit(0 if status(args.sweep_dir) else 1)
+    else:
+        collect(args.sweep_dir, {"time": args.time_output, "cache": args.cache_output}, args.counters_output)
@@ -1,47 +1,118 @@
 import pandas as pd
 import numpy as np
 
-def compute_block_percentile90(group):
-    results = []
-    rows = group.shape[0]
-    for i in range(0, rows, 10):
-        block = group.iloc[i:i+10]
-        if len(block) == 10:
-            p90 = np.percentile(block["exec_time"], 90, method='lower')
-            
-            row_data = block.iloc[0][[
-                "matrix_name", "compiler_option", "thread_option",
-                "chunk_size_option", "scheduling_option"
-            ]].to_dict()
-            
-            row_data["p90_exec_time"] = p90
-            results.append(row_data)
-            
-    return pd.DataFrame(results)
-
-def preprocess_csv(df):
-    df = df.replace({"Nan": np.nan, "NaN": np.nan})
+GROUP_COLS = [
+    "matrix_name", "compiler_option", "thread_option",
+    "chunk_size_option", "scheduling_option"
+]
+
+INTEGER_COLS = [
+    "rows", "cols", "nz",
+    "thread_option", "chunk_size_option"
+]
+
+# each configuration is measured in blocks of 10 warm iterations (see main.c)
+BLOCK_SIZE = 10
+
+STATISTICS = ["p90", "median", "min", "trimmed_mean"]
+
+def convert_types(df):
+    if all(df[col].dtype == 'Int64' for col in INTEGER_COLS):
+        # already typed, e.g. loaded through columnar.load()
+        return df
 
-    integer_cols = [
-        "rows", "cols", "nz",
-        "thread_option", "chunk_size_option"
-    ]
+    df = df.replace({"Nan": np.nan, "NaN": np.nan})
 
     print("Starting type conversion...")
-    for col in integer_cols:
+    for col in INTEGER_COLS:
         df[col] = pd.to_numeric(df[col], errors='coerce')
         df[col] = df[col].astype('Int64')
     print("Type conversion complete.")
 
-    df_sorted = df.sort_values([
-        "matrix_name", "compiler_option", "thread_option",
-        "chunk_size_option", "scheduling_option"
-    ])
+    return df
+
+def aggregate_blocks(df, stat="p90", block_size=BLOCK_SIZE, trim=0.1):
+    # Vectorized equivalent of the original groupby/apply over every block
+    # (kept in test_preprocess.py, which checks the two agree).
+    # Rows keep their file order inside each configuration, every run of
+    # block_size rows becomes a block and incomplete trailing blocks are dropped.
+    # Blocks are then sorted by exec_time and reshaped to (n_blocks, block_size)
+    # so every statistic is a positional take or a reduction along axis 1.
+    if stat not in STATISTICS:
+        raise ValueError(f"Unknown statistic '{stat}'. Use one of {STATISTICS}.")
+
+    grouped = df.groupby(GROUP_COLS, dropna=False, sort=True, observed=True)
+    group_id = grouped.ngroup().to_numpy()
+    block_id = grouped.cumcount().to_numpy() // block_size
+    group_len = grouped[GROUP_COLS[0]].transform("size").to_numpy()
+
+    full = (block_id + 1) * block_size <= group_len
+    n_blocks_max = block_id.max() + 1 if len(block_id) else 1
+    block_key = group_id[full].astype(np.int64) * n_blocks_max + block_id[full]
+    times = df["exec_time"].to_numpy(dtype=np.float64)[full]
+
+    order = np.lexsort((times, block_key))
+    sorted_times = times[order].reshape(-1, block_size)
+
+    if stat == "p90":
+        # same index as np.percentile(..., 90, method='lower')
+        values = sorted_times[:, int(np.floor(0.9 * (block_size - 1)))]
+    elif stat == "median":
+        values = np.median(sorted_times, axis=1)
+    elif stat == "min":
+        values = sorted_times[:, 0]
+    else:
+        cut = int(trim * block_size)
+        values = sorted_times[:, cut:block_size - cut].mean(axis=1)
+
+    first_rows = np.flatnonzero(full)[order[::block_size]]
+    result = df.iloc[first_rows][GROUP_COLS].reset_index(drop=True)
+    result[f"{stat}_exec_time"] = values
+
+    return result
+
+def preprocess_csv(df, stat="p90"):
+    df = convert_types(df)
+    return aggregate_blocks(df, stat=stat)
+
+def split_complete_blocks(df, block_size=BLOCK_SIZE):
+    # Separates the rows forming complete blocks from the trailing, still
+    # incomplete block of each configuration (kept in file order).
+    grouped = df.groupby(GROUP_COLS, dropna=False, sort=False, observed=True)
+    position = grouped.cumcount().to_numpy()
+    group_len = grouped[GROUP_COLS[0]].transform("size").to_numpy()
+    complete = position < group_len - group_len % block_size
+    return df[complete], df[~complete]
+
+def preprocess_csv_stream(csv_path, stat="p90", chunksize=1_000_000, block_size=BLOCK_SIZE, trim=0.1):
+    # Same table as preprocess_csv(pd.read_csv(csv_path)), reading the file
+    # chunksize rows at a time. Between chunks only the incomplete block of
+    # each configuration is carried over (at most block_size - 1 rows each),
+    # so peak memory depends on chunksize and on the number of configurations,
+    # not on the size of the file.
+    pending = None
+    aggregated = []
+
+    reader = pd.read_csv(
+        csv_path, chunksize=chunksize, usecols=GROUP_COLS + ["exec_time"],
+        na_values=["Nan", "NaN"],
+        dtype={"matrix_name": str, "compiler_option": str, "scheduling_option": str, "exec_time": np.float64}
+    )
+    for chunk in reader:
+        for col in ["thread_option", "chunk_size_option"]:
+            chunk[col] = pd.to_numeric(chunk[col], errors='coerce').astype('Int64')
+
+        if pending is not None and len(pending):
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+
+        complete, pending = split_complete_blocks(chunk, block_size)
+        if len(complete):
+            aggregated.append(aggregate_blocks(complete, stat, block_size, trim))
 
-    df_90_perc = df_sorted.groupby([
-        "matrix_name", "compiler_option",
-        "thread_option", "chunk_size_option",
-        "scheduling_option"
-    ], dropna=False, group_keys=False).apply(compute_block_percentile90).reset_index(drop=True)
+    if not aggregated:
+        return pd.DataFrame(columns=GROUP_COLS + [f"{stat}_exec_time"])
 
-    return df_90_perc
\ No newline at end of file
+    # blocks of a configuration were emitted in file order: a stable sort on
+    # the keys restores the ordering of the in-memory aggregation
+    result = pd.concat(aggregated, ignore_index=True)
+    return result.sort_values(GROUP_COLS, kind="mergesort", na_position="last").reset_index(drop=True)
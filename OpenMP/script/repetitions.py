@@ -0,0 +1,58 @@
+import subprocess
+import numpy as np
+
+# Adaptive repetitions of a single configuration. numpy only (no pandas), so
+# that orchestrate.py can use it on the cluster for run --target.
+
+SEQUENTIAL_BINARY = "./main_seq"
+PARALLEL_BINARY = "./main"
+
+P90_INDEX = 0.9  # np.percentile(..., 90, method='lower'), as in preprocess
+
+def run_block(mtx_path, threads=None, schedule=None, chunk=None, env=None):
+    # one invocation of main in "W" mode: a block of BLOCK_SIZE warm times in ms
+    if threads is None:
+        command = [SEQUENTIAL_BINARY, "W", mtx_path]
+    else:
+        command = [PARALLEL_BINARY, "W", mtx_path, str(threads), schedule, str(chunk)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True, env=env).stdout
+    return [float(line) for line in output.split()]
+
+def p90(samples):
+    ordered = np.sort(samples)
+    return ordered[int(np.floor(P90_INDEX * (len(ordered) - 1)))]
+
+def bootstrap_p90_ci(samples, confidence=0.95, resamples=2000, rng=None):
+    # percentile bootstrap of the (lower) 90th percentile
+    rng = np.random.default_rng() if rng is None else rng
+    samples = np.asarray(samples, dtype=np.float64)
+    n = len(samples)
+    k = int(np.floor(P90_INDEX * (n - 1)))
+    draws = samples[rng.integers(0, n, size=(resamples, n))]
+    estimates = np.partition(draws, k, axis=1)[:, k]
+    alpha = (1 - confidence) / 2
+    return np.quantile(estimates, alpha), np.quantile(estimates, 1 - alpha)
+
+def measure(mtx_path, threads=None, schedule=None, chunk=None, target=0.05, confidence=0.95,
+            min_blocks=1, max_blocks=10, resamples=2000, rng=None, env=None):
+    # Runs blocks until the confidence interval of the p90 over all the times
+    # collected is narrower than target * p90 (relative width), or max_blocks
+    # are reached. Returns (times, summary).
+    times = []
+    blocks = 0
+    while True:
+        times.extend(run_block(mtx_path, threads, schedule, chunk, env))
+        blocks += 1
+        low, high = bootstrap_p90_ci(times, confidence, resamples, rng)
+        estimate = p90(times)
+        converged = high - low <= target * estimate
+        if blocks >= min_blocks and (converged or blocks >= max_blocks):
+            break
+
+    return times, {
+        "repetitions": len(times),
+        "p90_exec_time": estimate,
+        "ci_low": low,
+        "ci_high": high,
+        "converged": int(converged),
+    }
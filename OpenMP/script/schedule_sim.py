@@ -0,0 +1,153 @@
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+import analysis
+import autotune
+import adaptive_sweep
+import omp_schedule
+
+OUTPUT_CSV = "results/simulated_schedule.csv"
+COSTS_JSON = "results/schedule_costs.json"
+
+# Cost of a configuration (ms once calibrated, "nonzero units" otherwise):
+# every row costs per_nz * nnz + per_row, every chunk taken by a dynamic or
+# guided thread costs per_chunk and the parallel region adds fixed.
+DEFAULT_COSTS = {"per_nz": 1.0, "per_row": 1.0, "per_chunk": 0.0, "fixed": 0.0}
+COST_TERMS = ["per_nz", "per_row", "per_chunk", "fixed"]
+
+def row_lengths(mtx_path):
+    rows, _, row_idx, _ = autotune.read_coo(mtx_path)
+    return np.bincount(row_idx, minlength=rows)
+
+def simulate(row_nnz, schedule, chunk, threads, costs=DEFAULT_COSTS):
+    # Makespan, per-thread work and imbalance of one configuration, with the
+    # nonzeros, rows and chunks of the thread finishing last (the terms the
+    # makespan is linear in, used by calibrate()).
+    row_cost = costs["per_nz"] * row_nnz + costs["per_row"]
+    dispatch = costs["per_chunk"] if schedule != "static" else 0.0
+    bounds, owner, start, finish = omp_schedule.assign(row_cost, schedule, chunk, threads, dispatch)
+
+    prefix = np.concatenate([[0], np.cumsum(row_nnz)])
+    chunk_nnz = prefix[bounds[:, 1]] - prefix[bounds[:, 0]]
+    chunk_rows = bounds[:, 1] - bounds[:, 0]
+
+    work = np.bincount(owner, weights=finish - start, minlength=threads)
+    end = np.zeros(threads)
+    np.maximum.at(end, owner, finish)
+    critical = int(end.argmax())
+    mine = owner == critical
+
+    return {
+        "makespan": end.max() + costs["fixed"],
+        "imbalance": work.max() / work.mean() if work.mean() > 0 else 1.0,
+        "work": work,
+        "chunks": len(bounds),
+        "critical_nnz": int(chunk_nnz[mine].sum()),
+        "critical_rows": int(chunk_rows[mine].sum()),
+        "critical_chunks": int(mine.sum()) if schedule != "static" else 0,
+    }
+
+def sweep(mtx_path, threads, chunks, schedules, costs=DEFAULT_COSTS):
+    row_nnz = row_lengths(mtx_path)
+    matrix_name = os.path.basename(mtx_path)
+    rows = []
+    for t in threads:
+        for chunk in chunks:
+            for schedule in schedules:
+                result = simulate(row_nnz, schedule, chunk, t, costs)
+                rows.append({
+                    "matrix_name": matrix_name, "thread_option": t, "chunk_size_option": chunk,
+                    "scheduling_option": schedule, "predicted_time": result["makespan"],
+                    "imbalance": result["imbalance"], "chunks": result["chunks"],
+                    "critical_nnz": result["critical_nnz"], "critical_rows": result["critical_rows"],
+                    "critical_chunks": result["critical_chunks"],
+                })
+    df = pd.DataFrame(rows)
+    df["rank"] = df.groupby("thread_option")["predicted_time"].rank(method="first").astype(int)
+    return df
+
+def calibrate(simulated, results):
+    # Least squares fit of the measured p90 times against the critical
+    # thread terms of the simulation (negative terms are dropped and the fit
+    # repeated). Returns (costs, merged table with the calibrated prediction).
+    measured = results.parallel.rename("measured_time").reset_index()
+    measured = measured.astype({"matrix_name": str, "scheduling_option": str,
+                                "thread_option": np.int64, "chunk_size_option": np.int64})
+    measured = measured.drop_duplicates(["matrix_name", "thread_option", "chunk_size_option", "scheduling_option"])
+    merged = simulated.merge(measured, on=["matrix_name", "thread_option", "chunk_size_option", "scheduling_option"])
+    if merged.empty:
+        raise ValueError("No simulated configuration has a measured time.")
+
+    terms = {"per_nz": "critical_nnz", "per_row": "critical_rows", "per_chunk": "critical_chunks"}
+    X = np.column_stack([merged[col].to_numpy(np.float64) for col in terms.values()] + [np.ones(len(merged))])
+    y = merged["measured_time"].to_numpy(np.float64)
+    active = np.ones(X.shape[1], dtype=bool)
+    while True:
+        coef = np.zeros(X.shape[1])
+        coef[active] = np.linalg.lstsq(X[:, active], y, rcond=None)[0]
+        if (coef >= 0).all():
+            break
+        active &= coef > 0
+
+    costs = dict(zip(COST_TERMS, coef.tolist()))
+    merged["calibrated_time"] = X @ coef
+    return costs, merged
+
+def report(merged):
+    relative_error = (merged["calibrated_time"] / merged["measured_time"] - 1).abs()
+    residual = ((merged["measured_time"] - merged["calibrated_time"]) ** 2).sum()
+    total = ((merged["measured_time"] - merged["measured_time"].mean()) ** 2).sum()
+    print(f"R^2 {1 - residual / total:.3f}, median |relative error| {relative_error.median():.1%} "
+          f"over {len(merged)} configurations")
+
+    # how well the simulation ranks the configurations of a thread count
+    rank = merged.groupby(["matrix_name", "thread_option"]).apply(
+        lambda g: g["calibrated_time"].corr(g["measured_time"], method="spearman"))
+    print(f"Spearman rank correlation per (matrix, threads): median {rank.median():.3f}, min {rank.min():.3f}")
+
+def load_costs(path):
+    with open(path) as f:
+        return {**DEFAULT_COSTS, **json.load(f)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Discrete-event simulation of the schedule(runtime) loop of main.c: "
+                                                 "predicted makespan, per-thread work and imbalance per configuration.")
+    parser.add_argument("mtx", type=str, nargs="+")
+    parser.add_argument("--threads", type=int, nargs="+", default=adaptive_sweep.THREAD_OPTIONS)
+    parser.add_argument("--chunks", type=int, nargs="+", default=adaptive_sweep.CHUNK_SIZE_OPTIONS)
+    parser.add_argument("--schedules", nargs="+", choices=omp_schedule.SCHEDULES, default=omp_schedule.SCHEDULES)
+    parser.add_argument("--costs", type=str, help="calibrated constants (json written by --calibrate)")
+    parser.add_argument("--calibrate", type=str, metavar="CSV",
+                        help="fit the constants on measured times (e.g. results/final_results_time.csv) and save them")
+    parser.add_argument("--costs-output", type=str, default=COSTS_JSON)
+    parser.add_argument("--top", type=int, help="print only the best TOP configurations per (matrix, threads)")
+    parser.add_argument("--output", type=str, default=OUTPUT_CSV)
+    args = parser.parse_args()
+
+    costs = load_costs(args.costs) if args.costs else DEFAULT_COSTS
+    simulated = pd.concat([sweep(m, args.threads, args.chunks, args.schedules, costs) for m in args.mtx],
+                          ignore_index=True)
+
+    if args.calibrate:
+        costs, merged = calibrate(simulated, analysis.load(args.calibrate))
+        print("Calibrated costs: " + ", ".join(f"{k} = {v:.3e}" for k, v in costs.items()))
+        report(merged)
+        os.makedirs(os.path.dirname(args.costs_output) or ".", exist_ok=True)
+        with open(args.costs_output, "w") as f:
+            json.dump(costs, f, indent=1)
+        print(f"Saved costs to {args.costs_output}")
+        simulated = pd.concat([sweep(m, args.threads, args.chunks, args.schedules, costs) for m in args.mtx],
+                              ignore_index=True)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    simulated.to_csv(args.output, index=False, float_format="%.6f")
+
+    shown = simulated if args.top is None else simulated[simulated["rank"] <= args.top]
+    columns = ["matrix_name", "thread_option", "rank", "scheduling_option", "chunk_size_option",
+               "predicted_time", "imbalance"]
+    with pd.option_context("display.width", 200, "display.max_rows", None):
+        print(shown.sort_values(["matrix_name", "thread_option", "rank"])[columns]
+              .to_string(index=False, float_format="{:.4g}".format))
+    print(f"Saved {len(simulated)} rows to {args.output}")
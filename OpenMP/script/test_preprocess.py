@@ -0,0 +1,105 @@
+import os
+import time
+import argparse
+import pandas as pd
+import numpy as np
+import preprocess
+from preprocess import GROUP_COLS
+
+# Checks the vectorized and the streaming block aggregation of preprocess.py
+# against the original groupby/apply implementation, on the committed results.
+# Run from the root (python3 script/test_preprocess.py) or through pytest.
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "results", "final_results_time.csv")
+
+def compute_block_percentile90(group):
+    # original implementation, one block of 10 rows at a time
+    results = []
+    rows = group.shape[0]
+    for i in range(0, rows, 10):
+        block = group.iloc[i:i+10]
+        if len(block) == 10:
+            p90 = np.percentile(block["exec_time"], 90, method='lower')
+
+            row_data = block.iloc[0][GROUP_COLS].to_dict()
+
+            row_data["p90_exec_time"] = p90
+            results.append(row_data)
+
+    return pd.DataFrame(results)
+
+def preprocess_csv_legacy(df):
+    df = preprocess.convert_types(df)
+
+    df_sorted = df.sort_values(GROUP_COLS)
+
+    df_90_perc = df_sorted.groupby(
+        GROUP_COLS, dropna=False, group_keys=False
+    )[df_sorted.columns.tolist()].apply(compute_block_percentile90).reset_index(drop=True)
+
+    return df_90_perc
+
+def replicate(df, factor):
+    # Grow the sweep by cloning every matrix under a new name, so the number
+    # of configurations scales together with the number of rows.
+    copies = []
+    for i in range(factor):
+        copy = df.copy()
+        copy["matrix_name"] = copy["matrix_name"] + f"#{i}"
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+def test_legacy_equivalence(csv_path=CSV_PATH):
+    df = pd.read_csv(csv_path)
+    legacy = preprocess_csv_legacy(df)
+    vectorized = preprocess.preprocess_csv(df)
+
+    for col in ["thread_option", "chunk_size_option"]:
+        legacy[col] = legacy[col].astype('Int64')
+
+    pd.testing.assert_frame_equal(legacy, vectorized, check_dtype=False)
+    print(f"Regression check passed: {len(vectorized)} blocks identical to the legacy output.")
+
+def test_stream_equivalence(csv_path=CSV_PATH, chunksizes=(7, 1000)):
+    # chunk sizes that are not multiples of the block size, so blocks straddle chunks
+    in_memory = preprocess.preprocess_csv(pd.read_csv(csv_path))
+    for chunksize in chunksizes:
+        streamed = preprocess.preprocess_csv_stream(csv_path, chunksize=chunksize)
+        pd.testing.assert_frame_equal(in_memory, streamed, check_dtype=False)
+        print(f"Streaming check passed: {len(streamed)} blocks identical with chunks of {chunksize} rows.")
+
+def benchmark(df, scales, legacy_max_scale):
+    print(f"{'scale':>6} {'rows':>10} {'legacy [s]':>12} {'vectorized [s]':>16}")
+    for scale in scales:
+        df_scaled = replicate(df, scale)
+        df_typed = preprocess.convert_types(df_scaled)
+
+        start = time.perf_counter()
+        preprocess.aggregate_blocks(df_typed)
+        vectorized_time = time.perf_counter() - start
+
+        legacy_time = np.nan
+        if scale <= legacy_max_scale:
+            df_sorted = df_typed.sort_values(GROUP_COLS)
+            start = time.perf_counter()
+            df_sorted.groupby(
+                GROUP_COLS, dropna=False, group_keys=False
+            )[df_sorted.columns.tolist()].apply(compute_block_percentile90)
+            legacy_time = time.perf_counter() - start
+
+        print(f"{scale:>6} {len(df_scaled):>10} {legacy_time:>12.3f} {vectorized_time:>16.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the block percentile aggregation against the legacy "
+                                                 "implementation and, optionally, benchmark both.")
+    parser.add_argument("--csv", type=str, default=CSV_PATH)
+    parser.add_argument("--benchmark", action="store_true",
+                        help="also time both implementations on replicated copies of the csv")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--legacy-max-scale", type=int, default=10,
+                        help="skip the (slow) legacy timing above this replication factor")
+    args = parser.parse_args()
+
+    test_legacy_equivalence(args.csv)
+    test_stream_equivalence(args.csv)
+    if args.benchmark:
+        benchmark(pd.read_csv(args.csv), args.scales, args.legacy_max_scale)
@@ -16,16 +16,8 @@ perf_start_options=("C" "W")
 src_files=("./src/main.c" "./src/csr.c" "./src/print.c" "./src/mmio.c")
 
 # Estrai info matrici
-declare -a input_matrices=()
-for f in "$data_dir_path"/*.mtx; do
-    while read -r line; do
-        if [[ $line != %* ]]; then
-            read -r M N nz <<< "$line"
-            input_matrices+=("$f,$M,$N,$nz")
-            break
-        fi
-    done < "$f"
-done
+# (from the catalog, see script/catalog.py: headers are read once per file)
+mapfile -t input_matrices < <(python3 script/catalog.py list "$data_dir_path" --top-level --refresh --header-only --csv --columns path rows cols nz)
 
 
 # Csv header for time results